@@ -2,18 +2,23 @@
 Singapore Rental RAG Assistant
 Streamlit Web UI - Main Entry File
 """
+import hashlib
+
 import streamlit as st
 
 from llm.deepseek_llm import get_deepseek_llm
-from rag.retriever import load_vectorstore, create_retriever
+from rag.retriever import load_vectorstore, create_retriever, prefetch_index_files
 from rag.chain import run_rag_query
+from rag.warmup import start_warmup
 from ui.layout import render_app
 from ui.components import normalize_sources
+from utils.cache import LRUCache
 from config import (
     DEEPSEEK_API_KEY,
     FAISS_PERSIST_DIR,
     FAISS_INDEX_NAME,
     INITIAL_RETRIEVAL_K,
+    ANSWER_CACHE_SIZE,
 )
 
 # =========================================================
@@ -30,39 +35,71 @@ st.set_page_config(
 # =========================================================
 def init_session_state():
     st.session_state.setdefault("user_identity", "Not Sure")
-    st.session_state.setdefault("draft_question", "")
     st.session_state.setdefault("messages", [])
+    st.session_state.setdefault("last_user_idx", None)
     st.session_state.setdefault("sources", [])
     st.session_state.setdefault("kb_loaded", False)
     st.session_state.setdefault("kb_blocks_count", 0)
     st.session_state.setdefault("api_key", DEEPSEEK_API_KEY or "")
 
-    # Internal shared objects
-    st.session_state.setdefault("vectorstore", None)
-    st.session_state.setdefault("llm_instance", None)
-    st.session_state.setdefault("retriever_instance", None)
+
+# =========================================================
+# Shared Resources (cached once per process, across sessions and reruns)
+# =========================================================
+@st.cache_resource(show_spinner=False)
+def _start_index_prefetch(persist_directory: str, index_name: str):
+    # Runs once per process: warm the page cache while the UI renders
+    return prefetch_index_files(persist_directory, index_name)
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_vectorstore(persist_directory: str, index_name: str):
+    return load_vectorstore(
+        persist_directory=persist_directory,
+        index_name=index_name,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_llm(api_key: str):
+    return get_deepseek_llm(api_key=api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_retriever():
+    # Built once per process on top of the cached vectorstore
+    vectorstore = _cached_vectorstore(FAISS_PERSIST_DIR, FAISS_INDEX_NAME)
+    return create_retriever(vectorstore, k=INITIAL_RETRIEVAL_K)
+
+
+@st.cache_resource(show_spinner=False)
+def _start_model_warmup():
+    # Runs once per process: load embeddings + reranker in the background before the first query
+    vectorstore = _cached_vectorstore(FAISS_PERSIST_DIR, FAISS_INDEX_NAME)
+    return start_warmup(vectorstore)
+
+
+@st.cache_resource(show_spinner=False)
+def _answer_cache() -> LRUCache:
+    # Process-wide answers keyed by (api key fingerprint, identity, question)
+    return LRUCache(maxsize=ANSWER_CACHE_SIZE)
 
 
 # =========================================================
 # Knowledge Base Loader (callable by UI)
 # =========================================================
 def load_knowledge_base():
-    if st.session_state.kb_loaded and st.session_state.vectorstore:
-        return st.session_state.vectorstore
-
     try:
-        vectorstore = load_vectorstore(
-            persist_directory=FAISS_PERSIST_DIR,
-            index_name=FAISS_INDEX_NAME,
-        )
+        vectorstore = _cached_vectorstore(FAISS_PERSIST_DIR, FAISS_INDEX_NAME)
         if vectorstore:
-            st.session_state.vectorstore = vectorstore
             st.session_state.kb_loaded = True
             try:
                 st.session_state.kb_blocks_count = vectorstore.index.ntotal
             except Exception:
                 st.session_state.kb_blocks_count = 0
             return vectorstore
+        # Do not keep a missing knowledge base cached, retry on next rerun
+        _cached_vectorstore.clear()
     except Exception as e:
         # Log error for debugging (visible in Streamlit Cloud logs)
         import traceback
@@ -73,14 +110,13 @@ def load_knowledge_base():
 
     st.session_state.kb_loaded = False
     st.session_state.kb_blocks_count = 0
-    st.session_state.vectorstore = None
     return None
 
 
 # =========================================================
 # RAG Query Handler (CALL ONLY, no side effects elsewhere)
 # =========================================================
-def handle_rag_query(question: str):
+def handle_rag_query(question: str, use_cache: bool = True, on_token=None):
     api_key = st.session_state.get("api_key", "")
     if not api_key:
         return ""
@@ -90,86 +126,107 @@ def handle_rag_query(question: str):
         return ""
 
     try:
-        # Cache LLM instance to avoid recreating it every time
-        llm = st.session_state.get("llm_instance")
-        if llm is None or st.session_state.get("api_key") != api_key:
-            llm = get_deepseek_llm(api_key=api_key)
-            st.session_state.llm_instance = llm
-        
-        # Cache retriever instance to avoid recreating it every time
-        retriever = st.session_state.get("retriever_instance")
-        if retriever is None or st.session_state.get("vectorstore") != vectorstore:
-            retriever = create_retriever(vectorstore, k=INITIAL_RETRIEVAL_K)
-            st.session_state.retriever_instance = retriever
+        llm = _cached_llm(api_key)
+        retriever = _cached_retriever()
 
+        # Identity goes into the prompt, the raw question is what gets embedded
         identity = st.session_state.get("user_identity", "Not Sure")
-        if identity and identity != "Not Sure":
-            question = f"(User identity: {identity}) {question}"
+
+        # Repeat questions are answered from cache (skips retrieval and the LLM round-trip)
+        cache = _answer_cache()
+        cache_key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest(), identity, question)
+        cached = cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            answer, sources = cached
+            st.session_state.sources = list(sources)
+            return answer
 
         # Execute query (progress will be shown in UI via placeholder)
-        result = run_rag_query(question, llm, retriever)
+        result = run_rag_query(question, llm, retriever, on_token=on_token, identity=identity)
 
         answer = result.get("answer", "")
         raw_citations = result.get("citations", [])
 
         st.session_state.sources = normalize_sources(raw_citations)
+        # Only cache answers backed by sources, so failed or empty runs are retried
+        if answer and st.session_state.sources:
+            cache.set(cache_key, (answer, tuple(st.session_state.sources)))
         return answer
 
     except Exception as e:
         return f"❌ Error occurred: {e}"
 
 
+def stream_rag_answer(question: str, spinner_text: str, use_cache: bool = True) -> str:
+    """Run a RAG query, streaming the answer into a new assistant message (call inside the chat area)"""
+    with st.chat_message("assistant"):
+        slot = st.empty()
+        tokens = []
+
+        def on_token(token: str):
+            tokens.append(token)
+            slot.markdown("".join(tokens))
+
+        with st.spinner(spinner_text):
+            answer = handle_rag_query(question, use_cache=use_cache, on_token=on_token)
+        # Final text (cached answers arrive without tokens); the next rerun shows it from the history
+        if answer:
+            slot.markdown(answer)
+        else:
+            slot.empty()
+    return answer
+
+
 # =========================================================
 # App Entry
 # =========================================================
 # Initialize state
 init_session_state()
 
-# Load knowledge base (only sync status, no UI effect)
-load_knowledge_base()
+# Warm FAISS files in the background (no-op after the first run)
+_start_index_prefetch(FAISS_PERSIST_DIR, FAISS_INDEX_NAME)
+
+# Load knowledge base (only sync status, no UI effect), then warm models (no-op after the first run)
+if load_knowledge_base():
+    _start_model_warmup()
+
+# Question to answer in this run: (question, spinner text, use_cache)
+pending_query = None
 
 # Handle trigger_send
 if st.session_state.get("trigger_send", False):
     st.session_state.trigger_send = False
     messages = st.session_state.get("messages", [])
     if messages and messages[-1].get("role") == "user":
-        question = messages[-1].get("content", "")
-        # Show loading placeholder
-        with st.spinner("🔍 Searching knowledge base and generating answer..."):
-            answer = handle_rag_query(question)
-        if answer:
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": answer
-            })
-            st.rerun()
+        pending_query = (messages[-1].get("content", ""), "🔍 Searching knowledge base and generating answer...", True)
 
 # Handle trigger_regenerate
 if st.session_state.get("trigger_regenerate", False):
     st.session_state.trigger_regenerate = False
     messages = st.session_state.get("messages", [])
-    # Find last user message
-    last_user_msg = None
-    for msg in reversed(messages):
-        if msg.get("role") == "user":
-            last_user_msg = msg.get("content")
-            break
+    # Last user message (index kept up to date by ui/layout.py)
+    last_user_idx = st.session_state.get("last_user_idx")
+    last_user_msg = messages[last_user_idx].get("content") if last_user_idx is not None else None
     
     if last_user_msg:
-        # Remove last assistant message
+        # Remove last assistant message (before the history is rendered)
         if messages and messages[-1].get("role") == "assistant":
             messages.pop()
             st.session_state.messages = messages
-        
-        # Show loading placeholder
-        with st.spinner("🔄 Regenerating answer..."):
-            answer = handle_rag_query(last_user_msg)
-        if answer:
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": answer
-            })
-            st.rerun()
-
-# Render UI (ALL UI lives in ui/layout.py)
-render_app()
+        # Regenerating must bypass the cache (and refreshes it)
+        pending_query = (last_user_msg, "🔄 Regenerating answer...", False)
+
+
+def answer_pending_query():
+    """Stream the pending answer below the chat history, then add it to the history"""
+    question, spinner_text, use_cache = pending_query
+    answer = stream_rag_answer(question, spinner_text, use_cache=use_cache)
+    if answer:
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": answer
+        })
+
+
+# Render UI (ALL UI lives in ui/layout.py); the pending answer streams inside the chat area
+render_app(answer_pending=answer_pending_query if pending_query else None)
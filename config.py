@@ -21,6 +21,18 @@ EMBEDDING_MODEL = os.getenv(
     "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 )
 USE_API_EMBEDDING = os.getenv("USE_API_EMBEDDING", "false").lower() == "true"
+# Embedding backend:
+#   "torch"   - sentence-transformers on PyTorch
+#   "onnx"    - ONNX Runtime INT8 model (run export_onnx.sh first)
+#   "st-onnx" - sentence-transformers ONNX backend, INT8 model exported automatically on first run
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_EMBEDDING_MODEL_DIR = os.getenv("ONNX_EMBEDDING_MODEL_DIR", "./models/minilm-int8")
+ONNX_EMBEDDING_MODEL_FILE = os.getenv("ONNX_EMBEDDING_MODEL_FILE", "model_quantized.onnx")
+ST_ONNX_MODEL_DIR = os.getenv("ST_ONNX_MODEL_DIR", "./models/minilm-st-onnx")
+ST_ONNX_QUANTIZATION = os.getenv("ST_ONNX_QUANTIZATION", "avx512_vnni")  # avx512_vnni / avx512 / avx2 / arm64
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))  # Texts per forward pass during ingestion
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))  # Query vectors kept in memory
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./data/emb_cache")  # On-disk cache of chunk embeddings (by content hash)
 
 # ==================== RAG Configuration ====================
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))  # Reduced to 500, adapted for short documents
@@ -28,15 +40,52 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))  # Correspondingly reduce
 # Reranking configuration
 INITIAL_RETRIEVAL_K = int(os.getenv("INITIAL_RETRIEVAL_K", "15"))  # Initial retrieval of 15 documents (reduced for performance)
 FINAL_RETRIEVAL_K = int(os.getenv("FINAL_RETRIEVAL_K", "8"))  # Return 8 documents after reranking
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "32"))  # Query-document pairs per CrossEncoder forward pass
+# Reranker backend: "torch" (sentence-transformers CrossEncoder) or "onnx" (ONNX Runtime INT8 model, run export_onnx.sh first)
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "torch").lower()
+ONNX_RERANKER_MODEL_DIR = os.getenv("ONNX_RERANKER_MODEL_DIR", "./models/reranker-int8")
+ONNX_RERANKER_MODEL_FILE = os.getenv("ONNX_RERANKER_MODEL_FILE", "model_quantized.onnx")
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))  # Cached (query, document) rerank scores
+RERANK_CACHE_TTL = float(os.getenv("RERANK_CACHE_TTL", "900"))  # Rerank score lifetime in seconds
 RETRIEVAL_K = FINAL_RETRIEVAL_K  # Maintain backward compatibility
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "3000"))  # Token budget for retrieved context in the prompt (0 = unlimited)
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))  # Retrieval results kept in memory per retriever (0 = off)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))  # Answers kept in memory for repeat questions (web UI)
 
 # ==================== Vector Store Configuration ====================
 FAISS_PERSIST_DIR = "./data/faiss"
 FAISS_INDEX_NAME = "singapore_rental"
+# Index type built by ingest.py:
+#   "hnsw_sq8" - HNSW graph over INT8 scalar-quantized vectors (4x less memory)
+#   "hnsw"     - HNSW graph over FP32 vectors
+#   "ivfpq"    - inverted lists over product-quantized codes (16-32x less memory, for large corpora)
+#   "flat"     - exact FP32 brute-force scan (use if approximate recall is insufficient)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "hnsw_sq8").lower()
+FAISS_TRAIN_SAMPLE_SIZE = int(os.getenv("FAISS_TRAIN_SAMPLE_SIZE", "10000"))  # Max vectors used to train quantizers
+# Memory-map the .faiss file instead of reading it into RAM (for IVF/HNSW indexes; flat indexes may need a full load)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "0") == "1"
+# Keep a GPU copy of the index for batched searches (requires faiss-gpu; flat and IVF indexes only, HNSW stays on CPU)
+USE_FAISS_GPU = os.getenv("USE_FAISS_GPU", "0") == "1"
+GPU_MIN_BATCH_SIZE = int(os.getenv("GPU_MIN_BATCH_SIZE", "8"))  # Smaller query batches search on CPU (faster there)
+HNSW_M = int(os.getenv("HNSW_M", "32"))  # Number of graph neighbours per vector
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))  # Build-time search breadth (higher = better graph)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))  # Query-time search breadth (higher = better recall, slower)
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # Number of IVF clusters (0 = min(256, 4 * sqrt(N)))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))  # Clusters scanned per query (higher = better recall, slower)
+PQ_M = int(os.getenv("PQ_M", "32"))  # Sub-quantizers per vector (rounded down to a divisor of the dimension)
+
+# ==================== Logging Configuration ====================
+# Level of the "rag.perf" timing logger (INFO shows per-query retrieval / rerank / LLM timings)
+RAG_PERF_LOG = os.getenv("RAG_PERF_LOG", "WARNING").strip().upper()
+
+# ==================== Ingestion Configuration ====================
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "16"))  # Concurrent page downloads in ingest.py
 
 # ==================== File Configuration ====================
 URLS_JSON_PATH = "./data/urls.json"
 EVALUATION_QUESTIONS_PATH = "./data/evaluation_questions.json"
+EVAL_CACHE_DIR = "./data/eval_cache"  # Cached evaluate.py results (keyed by question + index mtime + model)
+EVAL_MAX_WORKERS = int(os.getenv("EVAL_MAX_WORKERS", "8"))  # Concurrent questions in evaluate.py
 
 # ==================== Allowed Domain Whitelist ====================
 ALLOWED_DOMAINS = [
@@ -47,6 +96,8 @@ ALLOWED_DOMAINS = [
 ]
 
 # ==================== UI Configuration ====================
+IDENTITIES = ["Not Sure", "Student Pass", "Employment Pass(EP)", "LTVP", "Others"]
+
 EXAMPLE_QUESTIONS = [
     "Can students with a student pass rent HOBs?",
     "What is the shortest lease term for a HOB in months?",
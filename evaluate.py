@@ -2,19 +2,25 @@
 RAG 系统评测模块
 批量运行评测问题，生成评测报告
 """
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from llm.deepseek_llm import get_deepseek_llm
 from rag.retriever import load_vectorstore, create_retriever
 from rag.chain import run_rag_query
 from config import (
+    DEEPSEEK_MODEL,
     FAISS_PERSIST_DIR,
     FAISS_INDEX_NAME,
     INITIAL_RETRIEVAL_K,
     EVALUATION_QUESTIONS_PATH,
+    EVAL_CACHE_DIR,
+    EVAL_MAX_WORKERS,
 )
 
 
@@ -40,9 +46,61 @@ def load_evaluation_questions(json_path: str = None) -> List[Dict[str, Any]]:
     return questions
 
 
+def get_eval_cache_key(question: str) -> str:
+    """
+    计算评测结果缓存键（问题 + 向量库修改时间 + LLM 模型）
+    
+    Args:
+        question: 评测问题
+    
+    Returns:
+        缓存键（十六进制字符串）
+    """
+    faiss_path = os.path.join(FAISS_PERSIST_DIR, f"{FAISS_INDEX_NAME}.faiss")
+    index_mtime = os.path.getmtime(faiss_path) if os.path.exists(faiss_path) else 0
+    payload = f"{question}|{index_mtime}|{DEEPSEEK_MODEL}"
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def load_cached_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    读取缓存的 RAG 查询结果
+    
+    Args:
+        cache_key: 缓存键
+    
+    Returns:
+        缓存的结果字典（包含 answer, citations），不存在时返回 None
+    """
+    cache_path = os.path.join(EVAL_CACHE_DIR, f"{cache_key}.json")
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_result(cache_key: str, result: Dict[str, Any]) -> None:
+    """
+    保存 RAG 查询结果到缓存
+    
+    Args:
+        cache_key: 缓存键
+        result: run_rag_query 返回的结果字典
+    """
+    os.makedirs(EVAL_CACHE_DIR, exist_ok=True)
+    cache_path = os.path.join(EVAL_CACHE_DIR, f"{cache_key}.json")
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
 def evaluate_rag_system(
     questions: List[Dict[str, Any]] = None,
     output_report: str = "./evaluation_report.md",
+    use_cache: bool = True,
+    max_workers: int = None,
 ) -> Dict[str, Any]:
     """
     评测 RAG 系统
@@ -50,6 +108,8 @@ def evaluate_rag_system(
     Args:
         questions: 评测问题列表（如果为 None，从文件加载）
         output_report: 输出报告文件路径
+        use_cache: 是否复用未变化问题的缓存结果（问题、向量库、模型均未变化时跳过查询）
+        max_workers: 并发评测的线程数（如果为 None，使用 config.py 中的默认值）
     
     Returns:
         评测结果字典
@@ -57,6 +117,8 @@ def evaluate_rag_system(
     # 加载评测问题
     if questions is None:
         questions = load_evaluation_questions()
+    if max_workers is None:
+        max_workers = EVAL_MAX_WORKERS
     
     print(f"📋 加载了 {len(questions)} 个评测问题")
     
@@ -84,22 +146,25 @@ def evaluate_rag_system(
     retriever = create_retriever(vectorstore, k=INITIAL_RETRIEVAL_K)
     print(f"✅ Retriever 创建成功 (初始检索 k={INITIAL_RETRIEVAL_K}，重排序后返回 8 条)")
     
-    # 执行评测
-    results = []
-    success_count = 0
-    no_citation_count = 0
-    
-    print(f"\n🚀 开始评测...\n")
+    # 执行评测（每个问题主要耗时在 LLM API 调用上，使用线程池并发执行）
+    print_lock = threading.Lock()
     
-    for i, q_config in enumerate(questions, 1):
+    def _eval_one(i: int, q_config: Dict[str, Any]) -> Dict[str, Any]:
         question = q_config.get("question", "")
         category = q_config.get("category", "unknown")
-        
-        print(f"[{i}/{len(questions)}] {question}")
+        header = f"[{i}/{len(questions)}] {question}"
         
         try:
-            # 运行 RAG 查询
-            result = run_rag_query(question, llm, retriever)
+            # 问题、向量库、模型均未变化时复用上次结果
+            cache_key = get_eval_cache_key(question)
+            result = load_cached_result(cache_key) if use_cache else None
+            from_cache = result is not None
+            if result is None:
+                # 运行 RAG 查询
+                result = run_rag_query(question, llm, retriever)
+                # 只缓存有引用且回答非空的结果（LLM 调用失败、限流等会返回无引用的兜底回答，下次应重试）
+                if result.get("citations") and result.get("answer", "").strip():
+                    save_cached_result(cache_key, result)
             
             answer = result.get("answer", "")
             citations = result.get("citations", [])
@@ -110,27 +175,25 @@ def evaluate_rag_system(
             # 判断是否成功（有引用且回答不为空）
             is_success = has_citations and len(answer.strip()) > 0
             
-            if is_success:
-                success_count += 1
-            if not has_citations:
-                no_citation_count += 1
+            status = "✅" if is_success else "⚠️"
+            citation_status = f"引用: {len(citations)}" if has_citations else "无引用"
+            cache_status = " (缓存)" if from_cache else ""
+            with print_lock:
+                print(f"{header}\n   {status} {citation_status}{cache_status}")
             
-            results.append({
+            return {
                 "question": question,
                 "category": category,
                 "answer": answer,
                 "citations": citations,
                 "has_citations": has_citations,
                 "is_success": is_success,
-            })
-            
-            status = "✅" if is_success else "⚠️"
-            citation_status = f"引用: {len(citations)}" if has_citations else "无引用"
-            print(f"   {status} {citation_status}")
+            }
             
         except Exception as e:
-            print(f"   ❌ 错误: {e}")
-            results.append({
+            with print_lock:
+                print(f"{header}\n   ❌ 错误: {e}")
+            return {
                 "question": question,
                 "category": category,
                 "answer": "",
@@ -138,7 +201,16 @@ def evaluate_rag_system(
                 "has_citations": False,
                 "is_success": False,
                 "error": str(e),
-            })
+            }
+    
+    print(f"\n🚀 开始评测 (max_workers={max_workers})...\n")
+    
+    # pool.map 保持问题原有顺序
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_eval_one, range(1, len(questions) + 1), questions))
+    
+    success_count = sum(1 for r in results if r["is_success"])
+    no_citation_count = sum(1 for r in results if not r["has_citations"] and "error" not in r)
     
     # 生成报告
     success_rate = (success_count / len(questions)) * 100 if questions else 0
@@ -245,6 +317,17 @@ if __name__ == "__main__":
         default="./evaluation_report.md",
         help="输出报告文件路径",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="忽略缓存，重新运行所有评测问题",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=EVAL_MAX_WORKERS,
+        help="并发评测的线程数",
+    )
     
     args = parser.parse_args()
     
@@ -252,5 +335,7 @@ if __name__ == "__main__":
     evaluate_rag_system(
         questions=None if args.questions is None else load_evaluation_questions(args.questions),
         output_report=args.output,
+        use_cache=not args.no_cache,
+        max_workers=args.workers,
     )
 
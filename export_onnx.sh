@@ -0,0 +1,43 @@
+#!/bin/bash
+# 导出 INT8 量化的 ONNX Embedding 模型和重排序模型（EMBEDDING_BACKEND=onnx / RERANKER_BACKEND=onnx 时使用）
+# 依赖: pip install "optimum[onnxruntime]"
+
+# 获取脚本所在目录
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+cd "$SCRIPT_DIR"
+
+# 量化目标指令集: avx512_vnni / avx2 (x86) 或 arm64 (ARM / Apple Silicon)
+QUANTIZE_TARGET="${QUANTIZE_TARGET:-avx512_vnni}"
+
+# 导出并量化单个模型: export_model <模型> <任务> <中间目录> <输出目录>
+export_model() {
+    local model="$1" task="$2" export_dir="$3" output_dir="$4"
+
+    echo "🔧 步骤 1: 导出 ONNX 模型 ($model)..."
+    optimum-cli export onnx --model "$model" --task "$task" --optimize O3 "$export_dir" || exit 1
+
+    echo "🔧 步骤 2: 动态 INT8 量化 ($QUANTIZE_TARGET)..."
+    optimum-cli onnxruntime quantize --onnx_model "$export_dir" --"$QUANTIZE_TARGET" -o "$output_dir" || exit 1
+
+    echo "🔧 步骤 3: 复制 tokenizer 文件..."
+    cp -n "$export_dir"/*.json "$output_dir"/
+    cp -n "$export_dir"/*.model "$output_dir"/ 2>/dev/null
+    cp -n "$export_dir"/*.txt "$output_dir"/ 2>/dev/null
+
+    echo "✅ 导出完成: $output_dir"
+}
+
+export_model \
+    "${EMBEDDING_MODEL:-sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2}" \
+    feature-extraction \
+    "./models/minilm-onnx" \
+    "${ONNX_EMBEDDING_MODEL_DIR:-./models/minilm-int8}"
+
+export_model \
+    "${RERANKER_MODEL:-cross-encoder/ms-marco-MiniLM-L-6-v2}" \
+    text-classification \
+    "./models/reranker-onnx" \
+    "${ONNX_RERANKER_MODEL_DIR:-./models/reranker-int8}"
+
+echo "   使用方式: export EMBEDDING_BACKEND=onnx RERANKER_BACKEND=onnx"
+echo "   注意: 切换 Embedding 后端后请运行 python ingest.py --force 重建向量库"
@@ -2,17 +2,47 @@
 数据采集与入库模块
 从 urls.json 读取 URL，抓取网页，生成 LangChain Document，切分，embedding，写入 FAISS
 """
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+import faiss
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 
 from utils.html_loader import load_webpage
 from utils.text_cleaner import clean_text
-from rag.retriever import get_embeddings
-from config import CHUNK_SIZE, CHUNK_OVERLAP
+from rag.retriever import embedding_signature, get_embeddings
+from rag.embeddings import CachedEmbeddings
+from config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    FAISS_INDEX_TYPE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+    FAISS_TRAIN_SAMPLE_SIZE,
+    INGEST_MAX_WORKERS,
+    EMBEDDING_CACHE_DIR,
+    ALLOWED_DOMAINS,
+)
+
+# IVF-PQ 每个聚类中心至少需要的训练向量数（低于此值 k-means 训练不可靠）
+_IVF_MIN_POINTS_PER_CENTROID = 39
+# PQ 每个子量化器的编码位数（256 个码字）
+_PQ_NBITS = 8
+
+# 白名单域名集合（用于后缀的 O(1) 查找）
+_ALLOWED_DOMAINS = frozenset(domain.lower() for domain in ALLOWED_DOMAINS)
 
 
 def load_urls_from_json(json_path: str = "./data/urls.json") -> List[Dict[str, Any]]:
@@ -44,23 +74,159 @@ def check_url_domain_allowed(url: str) -> bool:
     Returns:
         如果 URL 在白名单中返回 True，否则返回 False
     """
-    allowed_domains = [
-        "gov.sg",
-        "hdb.gov.sg",
-        "cea.gov.sg",
-        "ura.gov.sg",
-    ]
-    
-    from urllib.parse import urlparse
-    parsed = urlparse(url)
-    domain = parsed.netloc.lower()
-    
-    # 检查是否匹配任何允许的域名
-    for allowed in allowed_domains:
-        if domain == allowed or domain.endswith("." + allowed):
-            return True
-    
-    return False
+    domain = urlparse(url).netloc.lower()
+    
+    # 检查域名本身或其任一父域名是否在白名单中（如 www.hdb.gov.sg -> hdb.gov.sg -> gov.sg）
+    parts = domain.split(".")
+    return any(".".join(parts[i:]) in _ALLOWED_DOMAINS for i in range(len(parts)))
+
+
+def compute_manifest_hash(urls: List[Dict[str, Any]], chunk_size: int, chunk_overlap: int) -> str:
+    """
+    计算入库输入的指纹（URL 列表 + 切分参数 + 索引类型 + Embedding 模型/后端/量化文件/归一化）
+    
+    Args:
+        urls: URL 配置列表
+        chunk_size: 文档切分大小
+        chunk_overlap: 文档切分重叠
+    
+    Returns:
+        SHA-256 十六进制字符串
+    """
+    manifest = {
+        "urls": urls,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "index_type": FAISS_INDEX_TYPE,
+        # 换模型或推理后端后旧向量与查询编码不一致，必须重建
+        "embedding": embedding_signature(normalize=True),
+    }
+    payload = json.dumps(manifest, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fetch_one(url_config: Dict[str, Any]) -> Tuple[Optional[Document], Optional[Dict[str, str]]]:
+    """
+    抓取并清理单个 URL（无共享状态，可在线程池中并发调用）
+    
+    Args:
+        url_config: URL 配置（包含 url, title, category）
+    
+    Returns:
+        成功时返回 (Document, None)，失败时返回 (None, {"url": ..., "reason": ...})
+    """
+    url = url_config.get("url", "")
+    title = url_config.get("title", "")
+    
+    # 检查域名白名单（在发起请求前尽早拒绝）
+    if not check_url_domain_allowed(url):
+        return None, {"url": url, "reason": "域名不在白名单"}
+    
+    try:
+        # 加载网页
+        doc = load_webpage(url)
+        
+        # 清理文本
+        cleaned_content = clean_text(doc.page_content)
+        if not cleaned_content or len(cleaned_content) < 100:
+            return None, {"url": url, "reason": f"内容过短 ({len(cleaned_content)} 字符)"}
+        
+        # 更新 metadata
+        doc.metadata.update({
+            "title": title or doc.metadata.get("title", ""),
+            "category": url_config.get("category", ""),
+        })
+        doc.page_content = cleaned_content
+        return doc, None
+    except Exception as e:
+        return None, {"url": url, "reason": str(e)}
+
+
+def build_faiss_index(vectors: np.ndarray, index_type: str = None) -> faiss.Index:
+    """
+    根据索引类型创建空的 FAISS 索引（需要训练的索引会先完成训练）
+    
+    Args:
+        vectors: 待写入的向量矩阵 (N, dim)，用于确定维度和训练量化器
+        index_type: 索引类型（"hnsw_sq8"、"hnsw"、"ivfpq" 或 "flat"，如果为 None，使用 config.py 中的默认值）
+    
+    Returns:
+        尚未写入向量的 FAISS 索引
+    """
+    if index_type is None:
+        index_type = FAISS_INDEX_TYPE
+    num_vectors, dim = vectors.shape
+    
+    if index_type == "ivfpq":
+        nlist = IVF_NLIST or min(256, int(4 * np.sqrt(num_vectors)))
+        min_points = _IVF_MIN_POINTS_PER_CENTROID * max(nlist, 2 ** _PQ_NBITS)
+        if num_vectors < min_points:
+            # 语料太少，无法可靠训练聚类中心和 PQ 码本，退回精确检索
+            print(f"⚠️  向量数 {num_vectors} 少于 IVF-PQ 训练所需的 {min_points}，改用 flat 索引")
+            index_type = "flat"
+    
+    # 向量已归一化，内积即余弦相似度，且比 L2 距离少一次减法和求范数
+    metric = faiss.METRIC_INNER_PRODUCT
+    if index_type == "hnsw_sq8":
+        # HNSW 图索引 + INT8 标量量化：内存约为 FP32 的 1/4，距离计算更快
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "hnsw":
+        # HNSW 图索引：对数级近似检索，召回率高
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        # 倒排聚类 + 乘积量化：每个向量仅存 m 字节编码，查询只扫描 nprobe 个聚类
+        m = max(d for d in range(1, min(PQ_M, dim) + 1) if dim % d == 0)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, _PQ_NBITS, metric)
+        index.nprobe = IVF_NPROBE
+    elif index_type == "flat":
+        # 暴力精确检索
+        index = faiss.IndexFlatIP(dim)
+    else:
+        raise ValueError(f"不支持的 FAISS 索引类型: {index_type}")
+    
+    # 量化索引需要先训练（向量过多时只取样本训练）
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > FAISS_TRAIN_SAMPLE_SIZE:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), FAISS_TRAIN_SAMPLE_SIZE, replace=False)]
+        index.train(sample)
+    
+    return index
+
+
+def create_vectorstore(
+    documents: List[Document],
+    embeddings: Embeddings,
+    index_type: str = None,
+) -> FAISS:
+    """
+    一次性批量生成 Embeddings，并写入指定类型的 FAISS 索引（内积度量）
+    
+    Args:
+        documents: 切分后的文档列表
+        embeddings: Embedding 模型实例（需输出 L2 归一化向量）
+        index_type: 索引类型（如果为 None，使用 config.py 中的默认值）
+    
+    Returns:
+        FAISS 向量库实例
+    """
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=build_faiss_index(vectors, index_type),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas)
+    return vectorstore
 
 
 def ingest_documents(
@@ -69,6 +235,8 @@ def ingest_documents(
     chunk_overlap: int = None,
     persist_directory: str = "./data/faiss",
     index_name: str = "singapore_rental",
+    max_workers: int = None,
+    force: bool = False,
 ) -> None:
     """
     执行数据采集与入库流程
@@ -79,62 +247,53 @@ def ingest_documents(
         chunk_overlap: 文档切分重叠（如果为 None，使用 config.py 中的默认值）
         persist_directory: FAISS 持久化目录
         index_name: FAISS 索引名称
+        max_workers: 并发抓取网页的线程数（如果为 None，使用 config.py 中的默认值）
+        force: 即使输入未变化也从头重建向量库（不加载、不追加旧库）
     """
     # 使用 config.py 中的默认值
     if chunk_size is None:
         chunk_size = CHUNK_SIZE
     if chunk_overlap is None:
         chunk_overlap = CHUNK_OVERLAP
+    if max_workers is None:
+        max_workers = INGEST_MAX_WORKERS
     # 加载 URL 列表
     if urls is None:
         urls = load_urls_from_json()
     
+    # 向量库已存在且输入未变化时直接跳过（FAISS 保存的文件是 .faiss 和 .pkl）
+    faiss_path = os.path.join(persist_directory, f"{index_name}.faiss")
+    pkl_path = os.path.join(persist_directory, f"{index_name}.pkl")
+    manifest_path = os.path.join(persist_directory, "manifest.sha256")
+    manifest_hash = compute_manifest_hash(urls, chunk_size, chunk_overlap)
+    if not force and os.path.exists(faiss_path) and os.path.exists(pkl_path) and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if f.read().strip() == manifest_hash:
+                print(f"✅ 向量库已是最新 ({persist_directory})，跳过入库（使用 --force 强制重建）")
+                return
+    # 走到这里说明使用了 --force 或输入已变化：下面总是从头构建新向量库，旧库文件会被覆盖
+    
     print(f"📋 共 {len(urls)} 个 URL 待处理")
     
-    # 步骤 1: 抓取网页并生成 Document
+    # 步骤 1: 并发抓取网页并生成 Document（网络 I/O 为主，线程可重叠等待时间）
     all_documents = []
     failed_urls = []
     
-    for i, url_config in enumerate(urls, 1):
-        url = url_config.get("url", "")
-        title = url_config.get("title", "")
-        
-        print(f"\n[{i}/{len(urls)}] 处理: {title}")
-        print(f"   URL: {url}")
-        
-        # 检查域名白名单
-        if not check_url_domain_allowed(url):
-            print(f"   ⚠️  警告: URL 不在白名单中，跳过")
-            failed_urls.append({"url": url, "reason": "域名不在白名单"})
-            continue
-        
-        try:
-            # 加载网页
-            doc = load_webpage(url)
+    print(f"🌐 并发抓取网页 (max_workers={max_workers})...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # pool.map 保持输入顺序，按顺序输出每个 URL 的处理结果
+        results = pool.map(fetch_one, urls)
+        for i, (url_config, (doc, failure)) in enumerate(zip(urls, results), 1):
+            print(f"\n[{i}/{len(urls)}] 处理: {url_config.get('title', '')}")
+            print(f"   URL: {url_config.get('url', '')}")
             
-            # 清理文本
-            cleaned_content = clean_text(doc.page_content)
-            print(f"   📏 清理后内容长度: {len(cleaned_content)} 字符")
-            if not cleaned_content or len(cleaned_content) < 100:
-                print(f"   ⚠️  警告: 提取的内容过短，跳过")
-                failed_urls.append({"url": url, "reason": "内容过短"})
+            if failure:
+                print(f"   ❌ 失败: {failure['reason']}")
+                failed_urls.append(failure)
                 continue
             
-            # 更新 metadata
-            doc.metadata.update({
-                "title": title or doc.metadata.get("title", ""),
-                "category": url_config.get("category", ""),
-            })
-            doc.page_content = cleaned_content
-            
             all_documents.append(doc)
-            print(f"   ✅ 成功: 提取 {len(cleaned_content)} 字符")
-            
-        except Exception as e:
-            print(f"   ❌ 失败: {e}")
-            failed_urls.append({"url": url, "reason": str(e)})
-            # 继续处理下一个 URL，不中断整个流程
-            continue
+            print(f"   ✅ 成功: 提取 {len(doc.page_content)} 字符")
     
     if not all_documents:
         print("\n❌ 没有成功提取任何文档")
@@ -169,41 +328,30 @@ def ingest_documents(
     print(f"\n🔢 生成 Embeddings 并写入向量库...")
     print("   (首次运行会下载模型，请耐心等待)")
     
-    embeddings = get_embeddings()
+    # 按内容哈希缓存 Embeddings，未变化的 chunk 不会重复计算；
+    # 命名空间取完整的 Embedding 配置（模型、后端、量化文件、归一化），切换任一项都不会复用旧向量
+    embeddings = CachedEmbeddings(
+        get_embeddings(normalize=True),
+        cache_dir=EMBEDDING_CACHE_DIR,
+        namespace=json.dumps(embedding_signature(normalize=True), sort_keys=True),
+    )
     
-    # 如果向量库已存在，加载并添加新文档
-    # FAISS 保存的文件是 .faiss 和 .pkl
-    faiss_path = os.path.join(persist_directory, f"{index_name}.faiss")
-    pkl_path = os.path.join(persist_directory, f"{index_name}.pkl")
-    if os.path.exists(faiss_path) and os.path.exists(pkl_path):
-        print(f"   📂 加载现有向量库: {persist_directory}")
-        try:
-            vectorstore = FAISS.load_local(
-                persist_directory,
-                embeddings,
-                allow_dangerous_deserialization=True,
-            )
-            # 添加新文档
-            vectorstore.add_documents(split_docs)
-            print(f"   ✅ 已添加 {len(split_docs)} 个新 chunks 到现有向量库")
-        except Exception as e:
-            print(f"   ⚠️  加载现有向量库失败，创建新向量库: {e}")
-            vectorstore = FAISS.from_documents(
-                documents=split_docs,
-                embedding=embeddings,
-            )
-            print(f"   ✅ 创建新向量库，包含 {len(split_docs)} 个 chunks")
-    else:
-        # 创建新向量库
-        vectorstore = FAISS.from_documents(
-            documents=split_docs,
-            embedding=embeddings,
-        )
-        print(f"   ✅ 创建新向量库，包含 {len(split_docs)} 个 chunks")
+    # 每次入库都基于全部 URL 重新构建（追加到旧库会让所有 chunk 重复一份）；
+    # 未变化的 chunk 命中 Embedding 缓存，重建只需重新构建索引
+    vectorstore = create_vectorstore(split_docs, embeddings)
+    print(f"   ✅ 创建新向量库 ({FAISS_INDEX_TYPE})，包含 {len(split_docs)} 个 chunks")
     
     # 持久化
     os.makedirs(persist_directory, exist_ok=True)
     vectorstore.save_local(persist_directory, index_name=index_name)
+    if failed_urls:
+        # 有 URL 抓取失败时不标记为最新，下次运行会重新入库补齐缺失页面
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        print(f"   ⚠️  {len(failed_urls)} 个 URL 失败，未写入 manifest（下次运行将重新入库）")
+    else:
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            f.write(manifest_hash)
     print(f"   💾 向量库已保存到: {persist_directory}")
     
     # 统计信息
@@ -246,6 +394,17 @@ if __name__ == "__main__":
         default="./data/faiss",
         help="FAISS 持久化目录",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INGEST_MAX_WORKERS,
+        help="并发抓取网页的线程数",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="即使输入未变化也从头重建向量库（不加载、不追加旧库）",
+    )
     
     args = parser.parse_args()
     
@@ -259,6 +418,8 @@ if __name__ == "__main__":
         chunk_overlap=args.chunk_overlap,
         persist_directory=args.persist_dir,
         index_name="singapore_rental",
+        max_workers=args.workers,
+        force=args.force,
     )
 
 
@@ -4,6 +4,7 @@ Wrap DeepSeek API using LangChain ChatModel interface
 """
 import os
 from typing import Optional
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
 
@@ -16,6 +17,13 @@ except ImportError:
     DEEPSEEK_BASE_URL = None
     DEEPSEEK_MODEL = None
 
+# Shared connection pools for all LLM instances: keep-alive connections are reused
+# across queries (no TCP + TLS handshake per call), HTTP/2 multiplexes concurrent calls
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_HTTP_TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+_HTTP_CLIENT = httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+_HTTP_ASYNC_CLIENT = httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
 
 def get_deepseek_llm(
     api_key: Optional[str] = None,
@@ -23,6 +31,7 @@ def get_deepseek_llm(
     model_name: Optional[str] = None,
     temperature: float = 0.3,
     max_tokens: int = 2000,
+    streaming: bool = True,
 ) -> BaseChatModel:
     """
     Create DeepSeek LLM instance
@@ -33,6 +42,7 @@ def get_deepseek_llm(
         model_name: Model name (priority: parameter > config > environment variable)
         temperature: Temperature parameter, default 0.3 (lower temperature ensures more accurate answers)
         max_tokens: Maximum generated tokens, default 2000
+        streaming: Request tokens incrementally (lets callers use llm.stream), default True
     
     Returns:
         LangChain ChatOpenAI instance (configured for DeepSeek API)
@@ -57,6 +67,9 @@ def get_deepseek_llm(
         openai_api_base=base_url,
         temperature=temperature,
         max_tokens=max_tokens,
+        streaming=streaming,
+        http_client=_HTTP_CLIENT,
+        http_async_client=_HTTP_ASYNC_CLIENT,
     )
     
     return llm
@@ -2,83 +2,297 @@
 RAG Chain Module
 Build and run RAG Q&A chain
 """
+import asyncio
+import hashlib
+import threading
 import time
-from typing import Dict, List, Optional, Any
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Any
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
 
-from rag.prompt import get_rag_prompt
+from rag.prompt import get_rag_prompt, format_identity
 from rag.retriever import create_retriever
-from rag.reranker import get_reranker
-from config import INITIAL_RETRIEVAL_K, FINAL_RETRIEVAL_K
+from rag.reranker import DocumentReranker, get_reranker
+from utils.perf import perf_logger
+from config import INITIAL_RETRIEVAL_K, FINAL_RETRIEVAL_K, MAX_CONTEXT_TOKENS
+
+# In-flight run_rag_query calls, so identical concurrent queries share one pipeline run
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+# Longest a coalesced caller waits for the leading call before running the pipeline itself
+_INFLIGHT_WAIT_SECONDS = 180.0
+
+
+# Rough characters-per-token ratio, used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """tiktoken cl100k_base encoding, or None if tiktoken (or its encoding file) is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def format_docs(docs: List[Document], max_tokens: Optional[int] = None) -> str:
+    """
+    Join document contents into the prompt context, within a token budget
+    
+    Documents are packed in order (most relevant first after reranking); the one
+    that crosses the budget is cut and the rest are dropped.
+    
+    Args:
+        docs: Retrieved documents
+        max_tokens: Context token budget (if None, use MAX_CONTEXT_TOKENS; 0 disables the limit)
+    
+    Returns:
+        Context string for the prompt
+    """
+    if max_tokens is None:
+        max_tokens = MAX_CONTEXT_TOKENS
+    if max_tokens <= 0:
+        return "\n\n".join(doc.page_content for doc in docs)
+    
+    encoding = _get_token_encoding()
+    parts = []
+    remaining = max_tokens
+    for doc in docs:
+        content = doc.page_content
+        if encoding is not None:
+            tokens = encoding.encode(content)
+            if len(tokens) > remaining:
+                content = encoding.decode(tokens[:remaining])
+            remaining -= min(len(tokens), remaining)
+        else:
+            max_chars = remaining * _CHARS_PER_TOKEN
+            if len(content) > max_chars:
+                content = content[:max_chars]
+            remaining -= -(-len(content) // _CHARS_PER_TOKEN)
+        parts.append(content)
+        if remaining <= 0:
+            break
+    return "\n\n".join(parts)
+
+
+def retrieve_documents(
+    question: str,
+    retriever: BaseRetriever,
+    reranker: Optional[DocumentReranker] = None,
+) -> List[Document]:
+    """
+    Retrieve candidate documents and rerank them (the single retrieval step of a query)
+    
+    Args:
+        question: User question
+        retriever: Retriever instance
+        reranker: Reranker instance (if None, use the shared singleton)
+    
+    Returns:
+        Top FINAL_RETRIEVAL_K documents after reranking
+    """
+    # Step 1: Initial retrieval (get more candidate documents)
+    retrieval_start = time.perf_counter()
+    initial_docs = retriever.invoke(question)
+    retrieval_time = time.perf_counter() - retrieval_start
+    perf_logger.info("Retrieval took %.2fs, retrieved %s docs", retrieval_time, len(initial_docs))
+    
+    # Step 2: Rerank (select most relevant documents)
+    rerank_start = time.perf_counter()
+    if reranker is None:
+        reranker = get_reranker()
+    retrieved_docs = reranker.rerank(question, initial_docs, top_k=FINAL_RETRIEVAL_K)
+    rerank_time = time.perf_counter() - rerank_start
+    perf_logger.info("Reranking took %.2fs, selected %s docs", rerank_time, len(retrieved_docs))
+    
+    return retrieved_docs
+
+
+async def aretrieve_documents(question: str, retriever: BaseRetriever) -> List[Document]:
+    """
+    Async retrieve_documents: runs the retrieval and the reranker lazy-load concurrently
+    
+    Args:
+        question: User question
+        retriever: Retriever instance
+    
+    Returns:
+        Top FINAL_RETRIEVAL_K documents after reranking
+    """
+    # Critical path is max(retrieval, reranker load) instead of their sum on cold start
+    retrieval_start = time.perf_counter()
+    initial_docs, reranker = await asyncio.gather(
+        retriever.ainvoke(question),
+        asyncio.to_thread(get_reranker),
+    )
+    retrieval_time = time.perf_counter() - retrieval_start
+    perf_logger.info("Retrieval took %.2fs, retrieved %s docs", retrieval_time, len(initial_docs))
+    
+    # CrossEncoder inference is CPU/GPU bound, keep it off the event loop
+    rerank_start = time.perf_counter()
+    retrieved_docs = await asyncio.to_thread(
+        reranker.rerank, question, initial_docs, top_k=FINAL_RETRIEVAL_K
+    )
+    rerank_time = time.perf_counter() - rerank_start
+    perf_logger.info("Reranking took %.2fs, selected %s docs", rerank_time, len(retrieved_docs))
+    
+    return retrieved_docs
+
+
+def build_citations(docs: List[Document]) -> List[Dict[str, str]]:
+    """Build citation entries (title, url, snippet) from retrieved documents"""
+    return [
+        {
+            "title": doc.metadata.get("title", "Unknown Title"),
+            "url": doc.metadata.get("url", ""),
+            "snippet": content[:200] + "..." if len(content := doc.page_content) > 200 else content,
+        }
+        for doc in docs
+        if isinstance(doc, Document)
+    ]
+
+
+def build_result(answer: str, retrieved_docs: List[Document]) -> Dict[str, Any]:
+    """Combine the LLM answer and retrieved documents into the query result"""
+    # Step 5: Build citations from the same retrieved documents
+    citations = build_citations(retrieved_docs)
+    
+    # If no documents are retrieved, return a prompt
+    if not citations:
+        answer = "The knowledge base does not cover this question. Please consult official agencies (HDB, CEA, or URA)."
+    # If documents are retrieved but answer is empty or still says "not covered", check if it's LLM's judgment
+    elif not answer or "knowledge base does not cover" in answer.lower() or "not covered" in answer.lower():
+        # Even if LLM judges it's not covered, still show retrieved documents as reference
+        pass  # Keep original answer but show citations
+    
+    return {
+        "answer": answer,
+        "citations": citations,
+    }
 
 
 def build_rag_chain(
     llm: BaseChatModel,
     retriever: BaseRetriever,
-) -> callable:
+) -> Callable[[Dict[str, Any]], str]:
     """
-    Build RAG Q&A chain (using LangChain LCEL)
+    Build RAG Q&A chain (a plain closure over prompt, reranker and LLM)
     
     Args:
         llm: LangChain ChatModel instance
         retriever: Retriever instance
     
     Returns:
-        Callable RAG chain function that accepts {"question": str} and returns answer
+        Callable RAG chain that accepts {"question": str, "docs": Optional[List[Document]]}
+        and returns the answer (retrieval only runs when no docs are passed in)
     """
-    # Get Prompt template
+    # Get Prompt template and reranker once, the chain closes over them
     prompt = get_rag_prompt()
+    reranker = get_reranker()
     
-    # Format retrieved documents
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-    
-    # Build chain using LangChain LCEL (LangChain Expression Language)
-    # Note: Need to properly handle input format
     def create_rag_input(input_dict):
-        """Process input, ensure correct format"""
+        """Process input, reusing pre-retrieved documents when given"""
         question = input_dict.get("question", input_dict.get("input", ""))
-        
-        # Step 1: Initial retrieval (get more candidate documents)
-        initial_docs = retriever.invoke(question)
-        
-        # Step 2: Rerank (select most relevant documents)
-        reranker = get_reranker()
-        reranked_docs = reranker.rerank(question, initial_docs, top_k=FINAL_RETRIEVAL_K)
-        
-        # Step 3: Format context
-        context = format_docs(reranked_docs)
+        docs = input_dict.get("docs")
+        if docs is None:
+            docs = retrieve_documents(question, retriever, reranker)
         return {
-            "context": context,
-            "question": question
+            "context": format_docs(docs),
+            "question": question,
+            "identity": format_identity(input_dict.get("identity")),
         }
     
-    rag_chain = (
-        RunnablePassthrough() | create_rag_input
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    def rag_chain(input_dict: Dict[str, Any]) -> str:
+        # Format and invoke directly, without LCEL Runnable wrapping per call
+        response = llm.invoke(prompt.format_messages(**create_rag_input(input_dict)))
+        return response.content if hasattr(response, 'content') else str(response)
     
     return rag_chain
 
 
+def run_rag_query_stream(
+    question: str,
+    llm: BaseChatModel,
+    retriever: BaseRetriever,
+    identity: str = "Not Sure",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run RAG query, yielding answer tokens as the LLM generates them
+    
+    Args:
+        question: User question
+        llm: LangChain ChatModel instance
+        retriever: Retriever instance
+        identity: User identity, given to the LLM via the prompt (not embedded with the question)
+    
+    Yields:
+        {"type": "token", "content": str} for each generated token, then a final
+        {"type": "done", "answer": str, "citations": [...]} event (same fields as run_rag_query)
+    """
+    # PERFORM RETRIEVAL AND RERANKING ONLY ONCE (shared by prompt context and citations)
+    start_time = time.perf_counter()
+    retrieved_docs = retrieve_documents(question, retriever)
+    
+    # Step 3: Format context for LLM
+    context = format_docs(retrieved_docs)
+    
+    # Step 4: Build prompt and stream LLM answer
+    prompt = get_rag_prompt()
+    
+    try:
+        # Format prompt with context and question
+        llm_start = time.perf_counter()
+        formatted_prompt = prompt.format_messages(
+            context=context,
+            question=question,
+            identity=format_identity(identity),
+        )
+        parts = []
+        for chunk in llm.stream(formatted_prompt):
+            token = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if token:
+                parts.append(token)
+                yield {"type": "token", "content": token}
+        answer = "".join(parts)
+        llm_time = time.perf_counter() - llm_start
+        perf_logger.info("LLM generation took %.2fs", llm_time)
+    except Exception as e:
+        # If LLM execution fails, return error message
+        answer = f"Error generating answer: {e}"
+        retrieved_docs = []
+    
+    total_time = time.perf_counter() - start_time
+    perf_logger.info("Total query time: %.2fs", total_time)
+    
+    # Final event carries the authoritative answer (may differ from the streamed tokens)
+    yield {"type": "done", **build_result(answer, retrieved_docs)}
+
+
 def run_rag_query(
     question: str,
     llm: BaseChatModel,
     retriever: BaseRetriever,
+    on_token: Optional[Callable[[str], None]] = None,
+    identity: str = "Not Sure",
 ) -> Dict[str, Any]:
     """
-    Run RAG query
+    Run RAG query (collects run_rag_query_stream into a single result)
+    
+    Identical concurrent queries (same question, identity, LLM and retriever) are
+    coalesced: the first call runs the pipeline, the others wait for its result
+    (and run the pipeline themselves if it fails or takes too long).
     
     Args:
         question: User question
         llm: LangChain ChatModel instance
         retriever: Retriever instance
+        on_token: Optional callback receiving answer tokens as they are generated
+        identity: User identity, given to the LLM via the prompt (not embedded with the question)
     
     Returns:
         Dictionary containing the following fields:
@@ -93,69 +307,186 @@ def run_rag_query(
             ]
         }
     """
-    # PERFORM RETRIEVAL AND RERANKING ONLY ONCE (performance optimization)
-    start_time = time.time()
+    key = hashlib.sha256(
+        f"{id(llm)}\0{id(retriever)}\0{identity}\0{question.strip().lower()}".encode("utf-8")
+    ).hexdigest()
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
     
-    # Step 1: Initial retrieval (get more candidate documents)
-    retrieval_start = time.time()
-    initial_docs = retriever.invoke(question)
-    retrieval_time = time.time() - retrieval_start
-    print(f"[Performance] Retrieval took {retrieval_time:.2f}s, retrieved {len(initial_docs)} docs")
+    if not is_leader:
+        # Same query already running: wait for it instead of calling retrieval and the LLM again
+        try:
+            result = future.result(timeout=_INFLIGHT_WAIT_SECONDS)
+        except Exception:
+            # Leader failed, was abandoned or is too slow: run the pipeline for this caller
+            return _collect_rag_query(question, llm, retriever, on_token, identity)
+        if on_token is not None and result["answer"]:
+            on_token(result["answer"])
+        return {"answer": result["answer"], "citations": list(result["citations"])}
     
-    # Step 2: Rerank (select most relevant documents)
-    rerank_start = time.time()
-    reranker = get_reranker()
-    retrieved_docs = reranker.rerank(question, initial_docs, top_k=FINAL_RETRIEVAL_K)
-    rerank_time = time.time() - rerank_start
-    print(f"[Performance] Reranking took {rerank_time:.2f}s, selected {len(retrieved_docs)} docs")
+    # The leader's on_token belongs to its own caller (e.g. a Streamlit session that may stop
+    # or rerun): its errors are kept out of the shared run and re-raised only to this caller
+    callback_error = None
     
-    # Step 3: Format context for LLM
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
+    def leader_on_token(token: str):
+        nonlocal callback_error
+        if on_token is None or callback_error is not None:
+            return
+        try:
+            on_token(token)
+        except BaseException as e:
+            callback_error = e
     
-    context = format_docs(retrieved_docs)
+    try:
+        result = _collect_rag_query(question, llm, retriever, leader_on_token, identity)
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    except BaseException:
+        # Interpreter/control-flow exceptions are this caller's only, followers just run without us
+        future.set_exception(RuntimeError("Leading query was abandoned"))
+        raise
+    else:
+        future.set_result(result)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    
+    if callback_error is not None:
+        raise callback_error
+    return {"answer": result["answer"], "citations": list(result["citations"])}
+
+
+def _collect_rag_query(
+    question: str,
+    llm: BaseChatModel,
+    retriever: BaseRetriever,
+    on_token: Optional[Callable[[str], None]],
+    identity: str,
+) -> Dict[str, Any]:
+    """Run run_rag_query_stream to completion, forwarding tokens to on_token"""
+    result = {"answer": "", "citations": []}
+    for event in run_rag_query_stream(question, llm, retriever, identity=identity):
+        if event["type"] == "token":
+            if on_token is not None:
+                on_token(event["content"])
+        else:
+            result = {"answer": event["answer"], "citations": event["citations"]}
+    return result
+
+
+async def arun_rag_query(
+    question: str,
+    llm: BaseChatModel,
+    retriever: BaseRetriever,
+    identity: str = "Not Sure",
+) -> Dict[str, Any]:
+    """
+    Async run_rag_query (for event-loop callers, e.g. FastAPI or asyncio.run)
+    
+    Args:
+        question: User question
+        llm: LangChain ChatModel instance
+        retriever: Retriever instance
+        identity: User identity, given to the LLM via the prompt (not embedded with the question)
+    
+    Returns:
+        Same dictionary as run_rag_query
+    """
+    start_time = time.perf_counter()
+    retrieved_docs = await aretrieve_documents(question, retriever)
     
-    # Step 4: Build prompt and execute LLM query
     prompt = get_rag_prompt()
     
     try:
-        # Format prompt with context and question
-        llm_start = time.time()
-        formatted_prompt = prompt.format_messages(context=context, question=question)
-        # Invoke LLM
-        response = llm.invoke(formatted_prompt)
+        llm_start = time.perf_counter()
+        formatted_prompt = prompt.format_messages(
+            context=format_docs(retrieved_docs),
+            question=question,
+            identity=format_identity(identity),
+        )
+        response = await llm.ainvoke(formatted_prompt)
         answer = response.content if hasattr(response, 'content') else str(response)
-        llm_time = time.time() - llm_start
-        print(f"[Performance] LLM generation took {llm_time:.2f}s")
+        llm_time = time.perf_counter() - llm_start
+        perf_logger.info("LLM generation took %.2fs", llm_time)
     except Exception as e:
         # If LLM execution fails, return error message
         answer = f"Error generating answer: {e}"
         retrieved_docs = []
     
-    total_time = time.time() - start_time
-    print(f"[Performance] Total query time: {total_time:.2f}s")
+    total_time = time.perf_counter() - start_time
+    perf_logger.info("Total query time: %.2fs", total_time)
     
-    # Step 5: Build citations from retrieved documents
-    citations = []
-    for doc in retrieved_docs:
-        if isinstance(doc, Document):
-            metadata = doc.metadata
-            citations.append({
-                "title": metadata.get("title", "Unknown Title"),
-                "url": metadata.get("url", ""),
-                "snippet": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-            })
+    return build_result(answer, retrieved_docs)
+
+
+async def run_rag_query_batch(
+    questions: List[str],
+    llm: BaseChatModel,
+    retriever: BaseRetriever,
+    identity: str = "Not Sure",
+    max_concurrency: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    Run several RAG queries together (for evaluations and background jobs)
     
-    # If no documents are retrieved, return a prompt
-    if not citations:
-        answer = "The knowledge base does not cover this question. Please consult official agencies (HDB, CEA, or URA)."
-    # If documents are retrieved but answer is empty or still says "not covered", check if it's LLM's judgment
-    elif not answer or "knowledge base does not cover" in answer.lower() or "not covered" in answer.lower():
-        # Even if LLM judges it's not covered, still show retrieved documents as reference
-        pass  # Keep original answer but show citations
+    Retrieval runs as one retriever batch, all candidates are reranked in a single
+    CrossEncoder call, and LLM requests are issued concurrently.
     
-    return {
-        "answer": answer,
-        "citations": citations,
-    }
-
+    Args:
+        questions: User questions
+        llm: LangChain ChatModel instance
+        retriever: Retriever instance
+        identity: User identity, given to the LLM via the prompt
+        max_concurrency: Maximum concurrent LLM requests
+    
+    Returns:
+        One run_rag_query result dictionary per question, in order
+    """
+    if not questions:
+        return []
+    
+    start_time = time.perf_counter()
+    
+    # Retrieval for all questions, overlapped with the reranker lazy-load
+    initial_docs_list, reranker = await asyncio.gather(
+        retriever.abatch(questions),
+        asyncio.to_thread(get_reranker),
+    )
+    retrieved_docs_list = await asyncio.to_thread(
+        reranker.rerank_batch, questions, initial_docs_list, top_k=FINAL_RETRIEVAL_K
+    )
+    perf_logger.info(
+        "Batch retrieval + reranking of %s questions took %.2fs",
+        len(questions), time.perf_counter() - start_time,
+    )
+    
+    prompt = get_rag_prompt()
+    formatted_identity = format_identity(identity)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def _answer_one(question: str, retrieved_docs: List[Document]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                formatted_prompt = prompt.format_messages(
+                    context=format_docs(retrieved_docs),
+                    question=question,
+                    identity=formatted_identity,
+                )
+                response = await llm.ainvoke(formatted_prompt)
+                answer = response.content if hasattr(response, 'content') else str(response)
+            except Exception as e:
+                # If LLM execution fails, return error message
+                answer = f"Error generating answer: {e}"
+                retrieved_docs = []
+        return build_result(answer, retrieved_docs)
+    
+    results = await asyncio.gather(*(
+        _answer_one(question, docs) for question, docs in zip(questions, retrieved_docs_list)
+    ))
+    perf_logger.info("Batch of %s questions took %.2fs", len(questions), time.perf_counter() - start_time)
+    return list(results)
@@ -0,0 +1,252 @@
+"""
+Embeddings Module
+Embedding wrappers used by ingestion and retrieval
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.cache import LRUCache
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that persists document vectors on disk, keyed by content hash"""
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        cache_dir: str = "./data/emb_cache",
+        namespace: Optional[str] = None,
+    ):
+        """
+        Initialize embedding cache
+
+        Args:
+            underlying: Embedding model used for cache misses
+            cache_dir: Directory holding the SQLite cache file
+            namespace: Cache namespace (defaults to model name + normalization, so different
+                vector spaces never share entries; pass one that also covers the backend and
+                model file when those can change under the same model name)
+        """
+        self.underlying = underlying
+        if namespace is None:
+            normalized = getattr(underlying, "normalize_embeddings", None)
+            if normalized is None:
+                normalized = getattr(underlying, "encode_kwargs", {}).get("normalize_embeddings", False)
+            model = getattr(underlying, "model_name", type(underlying).__name__)
+            namespace = f"{model}|normalized={bool(normalized)}"
+        self.namespace = namespace
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, "embeddings.sqlite"),
+            check_same_thread=False,
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> str:
+        """Content hash of a text within this cache namespace"""
+        return hashlib.blake2b(
+            f"{self.namespace}\0{text}".encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch cached vectors for the given keys"""
+        found = {}
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, only running the underlying model on texts not seen before
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Embedding vectors in the same order as texts
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(list(set(keys)))
+
+        # Embed each missing text once, even if it appears multiple times
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            rows = []
+            for key, vector in zip(missing.keys(), new_vectors):
+                vectors[key] = list(vector)
+                rows.append((key, np.asarray(vector, dtype=np.float32).tobytes()))
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Query embeddings are not persisted"""
+        return self.underlying.embed_query(text)
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """Embeddings wrapper that keeps recent query vectors in memory (repeat questions skip the model)"""
+
+    def __init__(self, underlying: Embeddings, maxsize: int = 4096):
+        """
+        Initialize query embedding cache
+
+        Args:
+            underlying: Embedding model used for cache misses
+            maxsize: Maximum number of cached query vectors
+        """
+        self.underlying = underlying
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def __getattr__(self, name):
+        # Expose the wrapped model's attributes (model_name, encode_kwargs, ...)
+        if name == "underlying":
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query, reusing the vector of an identical (whitespace-normalized) earlier query"""
+        # Whitespace only: the embedding models are cased, so "HDB" and "hdb" are different queries
+        key = re.sub(r"\s+", " ", text).strip()
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = tuple(self.underlying.embed_query(key))
+            self._cache.set(key, vector)
+        return list(vector)
+
+
+class ONNXEmbeddings(Embeddings):
+    """Sentence embeddings served by ONNX Runtime (INT8-quantized export, mean pooling in NumPy)"""
+
+    def __init__(
+        self,
+        model_dir: str,
+        file_name: str = "model_quantized.onnx",
+        batch_size: int = 32,
+        max_length: int = 128,
+        normalize_embeddings: bool = False,
+    ):
+        """
+        Initialize ONNX Runtime session and tokenizer
+
+        Args:
+            model_dir: Directory with the exported ONNX model and tokenizer files
+            file_name: ONNX model file inside model_dir
+            batch_size: Texts per session run
+            max_length: Maximum tokens per text (matches the sentence-transformers model)
+            normalize_embeddings: L2-normalize output vectors
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = f"onnx:{os.path.join(model_dir, file_name)}"
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.normalize_embeddings = normalize_embeddings
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, file_name),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {inp.name for inp in self.session.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Tokenize, run the transformer and mean-pool token embeddings"""
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self._input_names
+            }
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over non-padding tokens (same as the sentence-transformers Pooling layer)
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            batches.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        vectors = np.vstack(batches).astype(np.float32)
+        if self.normalize_embeddings:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def ensure_st_onnx_model(
+    model_name: str,
+    output_dir: str,
+    quantization: str = "avx512_vnni",
+) -> str:
+    """
+    Export a sentence-transformers model to a dynamically INT8-quantized ONNX file (first run only)
+
+    Requires sentence-transformers>=3.2 and optimum[onnxruntime]. Later process
+    starts find the file on disk and skip the export.
+
+    Args:
+        model_name: Sentence-transformers model name
+        output_dir: Directory for the exported model (tokenizer, config, onnx/ files)
+        quantization: ONNX Runtime quantization target ("avx512_vnni", "avx512", "avx2" or "arm64")
+
+    Returns:
+        Quantized ONNX file path relative to output_dir (the SentenceTransformer file_name)
+    """
+    file_name = os.path.join("onnx", f"model_qint8_{quantization}.onnx")
+    if os.path.exists(os.path.join(output_dir, file_name)):
+        return file_name
+
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    print(f"Exporting {model_name} to quantized ONNX ({quantization}) in {output_dir}...")
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save(output_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, output_dir)
+    return file_name
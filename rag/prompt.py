@@ -2,12 +2,30 @@
 RAG Prompt Template Module
 Define Prompt templates for RAG Q&A
 """
+from functools import lru_cache
+from typing import Optional
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 
+def format_identity(identity: Optional[str]) -> str:
+    """
+    Convert the UI identity selection into the {identity} prompt variable
+    
+    Args:
+        identity: Selected identity (e.g. "Student Pass"), "Not Sure" or None
+    
+    Returns:
+        Identity text for the prompt
+    """
+    if not identity or identity == "Not Sure":
+        return "Not specified"
+    return identity
+
+
+@lru_cache(maxsize=1)
 def get_rag_prompt() -> ChatPromptTemplate:
     """
-    Get RAG Q&A Prompt template
+    Get RAG Q&A Prompt template (built once, the same instance is shared by all queries)
     
     The returned Prompt guides the model to:
     1. Help users make decisions and take action, rather than fully reciting policies
@@ -97,6 +115,10 @@ After reading, users should naturally understand three things:
 2) Why is it like this
 3) What can I do next
 
+**User Identity:**
+{identity}
+(If an identity is given, tailor eligibility and rules to it. If it is "Not specified", answer for the general case.)
+
 **Context Information:**
 {context}
 
@@ -2,22 +2,147 @@
 Reranking Module
 Rerank retrieval results using CrossEncoder
 """
-from typing import List
+import hashlib
+import os
+import re
+import threading
+from typing import List, Sequence
+import numpy as np
 from langchain_core.documents import Document
-from sentence_transformers import CrossEncoder
+
+from utils.cache import LRUCache
+from config import (
+    RERANKER_BATCH_SIZE,
+    RERANKER_BACKEND,
+    ONNX_RERANKER_MODEL_DIR,
+    ONNX_RERANKER_MODEL_FILE,
+    RERANK_CACHE_SIZE,
+    RERANK_CACHE_TTL,
+)
+
+
+# Characters of each document scored by the CrossEncoder
+RERANK_SNIPPET_CHARS = 500
+
+# Quoted phrase ("..." or “...”), or a bare URL / file name lookup
+_QUOTED_RE = re.compile(r'["“][^"”]+["”]')
+_LOOKUP_RE = re.compile(r"^\s*(https?://\S+|\S+\.(pdf|html?))\s*$", re.IGNORECASE)
+
+
+def _is_literal(query: str) -> bool:
+    """Whether the query is an exact lookup, where retrieval order is already correct"""
+    return bool(_QUOTED_RE.search(query) or _LOOKUP_RE.match(query))
+
+
+def _hash_text(text: str) -> str:
+    """Short content hash used in rerank cache keys"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ONNXCrossEncoder:
+    """CrossEncoder served by ONNX Runtime (INT8-quantized export), same predict() interface"""
+    
+    def __init__(
+        self,
+        model_dir: str,
+        file_name: str = "model_quantized.onnx",
+        max_length: int = 512,
+    ):
+        """
+        Initialize ONNX Runtime session and tokenizer
+        
+        Args:
+            model_dir: Directory with the exported ONNX model and tokenizer files
+            file_name: ONNX model file inside model_dir
+            max_length: Maximum tokens per query-document pair
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, file_name),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {inp.name for inp in self.session.get_inputs()}
+    
+    def predict(
+        self,
+        pairs: Sequence[Sequence[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+    ) -> np.ndarray:
+        """
+        Score query-document pairs
+        
+        Args:
+            pairs: [query, document] pairs
+            batch_size: Pairs per session run
+            show_progress_bar: Unused, kept for CrossEncoder compatibility
+            convert_to_numpy: Unused, scores are always a NumPy array
+        
+        Returns:
+            Relevance scores in [0, 1] (sigmoid of the logit, as CrossEncoder does for 1-label models)
+        """
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            encoded = self.tokenizer(
+                [query for query, _ in batch],
+                [doc for _, doc in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self._input_names
+            }
+            logits = self.session.run(None, feeds)[0]
+            scores.append(logits[:, 0])
+        
+        logits = np.concatenate(scores).astype(np.float32)
+        return 1.0 / (1.0 + np.exp(-logits))
 
 
 class DocumentReranker:
     """Document reranker"""
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = RERANKER_BATCH_SIZE,
+    ):
         """
         Initialize reranking model
         
         Args:
             model_name: CrossEncoder model name
+            batch_size: Query-document pairs per forward pass
         """
-        self.reranker = CrossEncoder(model_name)
+        if RERANKER_BACKEND == "onnx":
+            # INT8-quantized ONNX export of the same model (see export_onnx.sh)
+            self.reranker = ONNXCrossEncoder(ONNX_RERANKER_MODEL_DIR, file_name=ONNX_RERANKER_MODEL_FILE)
+        else:
+            # Imported here so the ONNX backend never loads PyTorch
+            import torch
+            from sentence_transformers import CrossEncoder
+            
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.reranker = CrossEncoder(model_name, device=device)
+            if device == "cuda":
+                # FP16 halves memory traffic on GPU, ranking quality is unaffected
+                self.reranker.model.half()
+        self.batch_size = batch_size
+        # (query hash, snippet hash) -> score, so repeat questions skip the forward pass
+        self._score_cache = LRUCache(maxsize=RERANK_CACHE_SIZE, ttl=RERANK_CACHE_TTL)
     
     def rerank(
         self,
@@ -36,32 +161,100 @@ class DocumentReranker:
         Returns:
             Reranked document list (sorted by relevance from high to low)
         """
-        if not documents:
-            return []
+        return self.rerank_batch([query], [documents], top_k=top_k)[0]
+    
+    def rerank_batch(
+        self,
+        queries: List[str],
+        documents_list: List[List[Document]],
+        top_k: int = 8
+    ) -> List[List[Document]]:
+        """
+        Rerank the documents of several queries with a single CrossEncoder call
+        
+        Args:
+            queries: User questions
+            documents_list: Retrieved document list for each question
+            top_k: Return top k documents per question
+        
+        Returns:
+            Reranked document list for each question (sorted by relevance from high to low)
+        """
+        results: List[List[Document]] = [[] for _ in queries]
         
         # Limit document length to avoid slow computation due to excessive length
-        pairs = [[query, doc.page_content[:500]] for doc in documents]
+        pairs, keys, owners = [], [], []
+        for q_idx, (query, documents) in enumerate(zip(queries, documents_list)):
+            if not documents:
+                continue
+            # Exact lookups gain nothing from the cross-encoder, keep the retrieval order
+            if _is_literal(query):
+                results[q_idx] = documents[:top_k]
+                continue
+            query_hash = _hash_text(query)
+            for doc in documents:
+                snippet = doc.page_content[:RERANK_SNIPPET_CHARS]
+                pairs.append([query, snippet])
+                keys.append((query_hash, _hash_text(snippet)))
+                owners.append(q_idx)
+        
+        if not pairs:
+            return results
+        
+        # Reuse cached scores, only run the model on pairs not scored recently
+        scores = np.empty(len(pairs), dtype=np.float32)
+        uncached = []
+        for i, key in enumerate(keys):
+            score = self._score_cache.get(key)
+            if score is None:
+                uncached.append(i)
+            else:
+                scores[i] = score
         
-        # Calculate relevance scores
-        scores = self.reranker.predict(pairs)
+        if uncached:
+            # Score pairs sorted by length so each batch pads to similar lengths,
+            # then write scores back to their original positions
+            uncached.sort(key=lambda i: len(pairs[i][1]))
+            new_scores = self.reranker.predict(
+                [pairs[i] for i in uncached],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+            for i, score in zip(uncached, new_scores):
+                scores[i] = score
+                self._score_cache.set(keys[i], float(score))
         
-        # Sort by score (from high to low)
-        scored_docs = list(zip(documents, scores))
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
+        # Pairs of a query are contiguous: split scores back per query
+        owners = np.asarray(owners)
+        for q_idx in np.unique(owners):
+            positions = np.flatnonzero(owners == q_idx)
+            query_scores = scores[positions]
+            
+            # Select top_k by partial partition, then sort only those (from high to low)
+            k = min(top_k, len(query_scores))
+            if k <= 0:
+                continue
+            top_idx = np.argpartition(-query_scores, k - 1)[:k]
+            top_idx = top_idx[np.argsort(-query_scores[top_idx], kind="stable")]
+            documents = documents_list[q_idx]
+            results[q_idx] = [documents[i] for i in top_idx]
         
-        # Return top_k
-        return [doc for doc, score in scored_docs[:top_k]]
+        return results
 
 
 # Global singleton to avoid reloading model
 _reranker_instance = None
+_reranker_lock = threading.Lock()
 
 
 def get_reranker() -> DocumentReranker:
-    """Get reranker singleton"""
+    """Get reranker singleton (thread-safe, so concurrent first calls load the model once)"""
     global _reranker_instance
     if _reranker_instance is None:
-        _reranker_instance = DocumentReranker()
+        with _reranker_lock:
+            if _reranker_instance is None:
+                _reranker_instance = DocumentReranker()
     return _reranker_instance
 
 
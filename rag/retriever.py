@@ -3,48 +3,293 @@ RAG Retriever Module
 Responsible for retrieving relevant documents from vector store
 """
 import os
+import pickle
+import re
+import threading
 import traceback
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import faiss
+import numpy as np
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
 
+from utils.cache import LRUCache
+from rag.embeddings import ONNXEmbeddings, QueryCachedEmbeddings, ensure_st_onnx_model
+from config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    ONNX_EMBEDDING_MODEL_DIR,
+    ONNX_EMBEDDING_MODEL_FILE,
+    ST_ONNX_MODEL_DIR,
+    ST_ONNX_QUANTIZATION,
+    HNSW_EF_SEARCH,
+    IVF_NPROBE,
+    FAISS_MMAP,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    USE_FAISS_GPU,
+    GPU_MIN_BATCH_SIZE,
+    RETRIEVAL_CACHE_SIZE,
+)
 
-# Global singleton for embeddings to avoid reloading
-_embeddings_instance = None
-_embeddings_model_name = None
 
-def get_embeddings(model_name: Optional[str] = None) -> HuggingFaceEmbeddings:
+# Cached embedding instances (one per model + normalization), kept for the life of the process
+# so Streamlit reruns and repeated callers never reload the model
+_embeddings_instances: Dict[Tuple[str, bool], Embeddings] = {}
+_embeddings_lock = threading.Lock()
+
+# GPU resources must outlive every GPU index created from them
+_gpu_resources = None
+
+def embedding_signature(model_name: Optional[str] = None, normalize: bool = True) -> Dict[str, Any]:
     """
-    Get Embedding model instance (cached singleton)
+    Settings that determine the embedding vector space (vectors built under a different
+    signature are not comparable with queries encoded under this one)
     
     Args:
-        model_name: Embedding model name (default uses multilingual model)
+        model_name: Embedding model name (default EMBEDDING_MODEL)
+        normalize: L2-normalize vectors
     
     Returns:
-        HuggingFaceEmbeddings instance
+        Dictionary of model, backend, backend-specific model file and normalization
+    """
+    if model_name is None:
+        model_name = EMBEDDING_MODEL
+    signature = {"model": model_name, "backend": EMBEDDING_BACKEND, "normalize": normalize}
+    if EMBEDDING_BACKEND == "onnx":
+        signature["model_file"] = os.path.join(ONNX_EMBEDDING_MODEL_DIR, ONNX_EMBEDDING_MODEL_FILE)
+    elif EMBEDDING_BACKEND == "st-onnx":
+        signature["quantization"] = ST_ONNX_QUANTIZATION
+    return signature
+
+
+def get_embeddings(model_name: Optional[str] = None, normalize: bool = True) -> Embeddings:
     """
-    global _embeddings_instance, _embeddings_model_name
+    Get Embedding model instance (cached per model name and normalization, thread-safe)
+    
+    Args:
+        model_name: Embedding model name (default uses multilingual model)
+        normalize: L2-normalize vectors, so inner product equals cosine similarity
+            (legacy L2 indexes were built from unnormalized vectors)
     
+    Returns:
+        HuggingFaceEmbeddings instance (PyTorch, or ONNX when EMBEDDING_BACKEND=st-onnx),
+        or ONNXEmbeddings when EMBEDDING_BACKEND=onnx
+        (wrapped in QueryCachedEmbeddings, so repeat queries are not re-encoded)
+    """
     if model_name is None:
-        # Default to multilingual model, supports Chinese and English
-        model_name = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        # Default to multilingual model (EMBEDDING_MODEL), supports Chinese and English
+        model_name = EMBEDDING_MODEL
     
-    # Return cached instance if model name matches
-    if _embeddings_instance is not None and _embeddings_model_name == model_name:
-        return _embeddings_instance
+    # Return cached instance if model name and normalization match
+    key = (model_name, normalize)
+    instance = _embeddings_instances.get(key)
+    if instance is not None:
+        return instance
     
-    # Create new instance and cache it
-    _embeddings_instance = HuggingFaceEmbeddings(model_name=model_name)
-    _embeddings_model_name = model_name
-    return _embeddings_instance
+    # Concurrent first calls (e.g. warmup thread and first query) load the model once
+    with _embeddings_lock:
+        instance = _embeddings_instances.get(key)
+        if instance is not None:
+            return instance
+        
+        # Create new instance and cache it
+        if EMBEDDING_BACKEND == "onnx":
+            # INT8-quantized ONNX export of the same model (see export_onnx.sh)
+            embeddings = ONNXEmbeddings(
+                ONNX_EMBEDDING_MODEL_DIR,
+                file_name=ONNX_EMBEDDING_MODEL_FILE,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                normalize_embeddings=normalize,
+            )
+        elif EMBEDDING_BACKEND == "st-onnx":
+            # sentence-transformers ONNX backend with a dynamically INT8-quantized model,
+            # exported on first run and reused from disk afterwards
+            file_name = ensure_st_onnx_model(model_name, ST_ONNX_MODEL_DIR, ST_ONNX_QUANTIZATION)
+            embeddings = HuggingFaceEmbeddings(
+                model_name=ST_ONNX_MODEL_DIR,
+                model_kwargs={"backend": "onnx", "model_kwargs": {"file_name": file_name}},
+                encode_kwargs={
+                    "batch_size": EMBEDDING_BATCH_SIZE,
+                    "normalize_embeddings": normalize,
+                },
+            )
+        else:
+            # Large batches amortize per-call overhead when embedding many chunks at ingest
+            embeddings = HuggingFaceEmbeddings(
+                model_name=model_name,
+                encode_kwargs={
+                    "batch_size": EMBEDDING_BATCH_SIZE,
+                    "normalize_embeddings": normalize,
+                },
+            )
+        instance = QueryCachedEmbeddings(embeddings, maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+        _embeddings_instances[key] = instance
+        return instance
+
+
+def _index_to_gpu(index: faiss.Index) -> Optional[faiss.Index]:
+    """
+    Copy a FAISS index to GPU 0 if a GPU build of FAISS and a GPU are available
+    
+    Args:
+        index: CPU index
+    
+    Returns:
+        GPU index, or None if no GPU is usable or the index type has no GPU version (e.g. HNSW)
+    """
+    global _gpu_resources
+    
+    if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+        print("USE_FAISS_GPU is set but no GPU is available, searching on CPU")
+        return None
+    
+    try:
+        if _gpu_resources is None:
+            _gpu_resources = faiss.StandardGpuResources()
+        return faiss.index_cpu_to_gpu(_gpu_resources, 0, index)
+    except Exception as e:
+        print(f"Index cannot be moved to GPU ({e}), searching on CPU")
+        return None
+
+
+def _read_into_page_cache(path: str, chunk_size: int = 1 << 20) -> None:
+    """Sequentially read a file so its pages are resident in the OS page cache"""
+    try:
+        with open(path, "rb") as f:
+            if hasattr(os, "posix_fadvise"):
+                # Hint the kernel to start readahead for the whole file
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            buffer = bytearray(chunk_size)
+            while f.readinto(buffer):
+                pass
+    except OSError:
+        # Prefetch is best effort, the real load reports missing files
+        pass
+
+
+def prefetch_index_files(
+    persist_directory: str = "./data/faiss",
+    index_name: str = "singapore_rental",
+) -> List[threading.Thread]:
+    """
+    Warm the OS page cache with the FAISS files in background daemon threads
+
+    Large sequential reads are much faster than the random page faults a
+    memory-mapped index would otherwise take on the first queries. The .faiss
+    and .pkl files are read concurrently (one thread each) so their I/O overlaps.
+
+    Args:
+        persist_directory: Vector store persistence directory
+        index_name: Index name (FAISS uses file name)
+
+    Returns:
+        The started prefetch threads
+    """
+    paths = [
+        os.path.join(persist_directory, f"{index_name}.faiss"),
+        os.path.join(persist_directory, f"{index_name}.pkl"),
+    ]
+
+    threads = []
+    for path in paths:
+        thread = threading.Thread(
+            target=_read_into_page_cache,
+            args=(path,),
+            name=f"faiss-prefetch-{os.path.basename(path)}",
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def read_vectorstore(
+    faiss_path: str,
+    pkl_path: str,
+    embeddings: Optional[Embeddings] = None,
+    mmap: bool = False,
+) -> FAISS:
+    """
+    Read a persisted FAISS index and docstore into a LangChain FAISS vector store
+    
+    Inner-product indexes hold L2-normalized vectors, older L2 indexes hold raw
+    vectors; the distance strategy (and default query embeddings) follow the index metric.
+    
+    Args:
+        faiss_path: Path of the .faiss index file
+        pkl_path: Path of the .pkl docstore file
+        embeddings: Embedding model instance (if None, picks the default matching the index)
+        mmap: Memory-map the index from disk instead of copying it into RAM
+            (falls back to a full read for index types that cannot be mapped)
+    
+    Returns:
+        FAISS vector store instance
+    """
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(faiss_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            # Not every index type (or FAISS build) can be memory-mapped, a full read always works
+            print(f"Memory-mapped load not supported ({e}), reading index into memory")
+    if index is None:
+        index = faiss.read_index(faiss_path)
+    with open(pkl_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    
+    inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
+    if embeddings is None:
+        embeddings = get_embeddings(normalize=inner_product)
+    
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+        distance_strategy=(
+            DistanceStrategy.MAX_INNER_PRODUCT if inner_product
+            else DistanceStrategy.EUCLIDEAN_DISTANCE
+        ),
+    )
+
+
+# (faiss_path, pkl_path) pairs already seen on disk, so warm loads skip the stat calls.
+# Only positive results are kept: a missing index is re-checked until ingest creates it
+_present_index_files = set()
+
+
+def _missing_index_files(faiss_path: str, pkl_path: str) -> List[str]:
+    """Index files that are missing or empty (stat once per path pair, then cached)"""
+    if (faiss_path, pkl_path) in _present_index_files:
+        return []
+    
+    missing = []
+    for path in (faiss_path, pkl_path):
+        try:
+            if os.stat(path).st_size == 0:
+                missing.append(path)
+        except OSError:
+            missing.append(path)
+    if not missing:
+        _present_index_files.add((faiss_path, pkl_path))
+    return missing
+
+
+def clear_index_cache() -> None:
+    """Forget which index files were found (call before reloading a rebuilt or deleted index)"""
+    _present_index_files.clear()
 
 
 def load_vectorstore(
     persist_directory: str = "./data/faiss",
     index_name: str = "singapore_rental",
-    embeddings: Optional[HuggingFaceEmbeddings] = None,
+    embeddings: Optional[Embeddings] = None,
 ) -> Optional[FAISS]:
     """
     Load existing vector store
@@ -52,7 +297,7 @@ def load_vectorstore(
     Args:
         persist_directory: Vector store persistence directory
         index_name: Index name (FAISS uses file name)
-        embeddings: Embedding model instance (if None, will create default instance)
+        embeddings: Embedding model instance (if None, will create default instance matching the index)
     
     Returns:
         FAISS vector store instance, returns None if it doesn't exist
@@ -61,31 +306,27 @@ def load_vectorstore(
     faiss_path = os.path.join(persist_directory, f"{index_name}.faiss")
     pkl_path = os.path.join(persist_directory, f"{index_name}.pkl")
     
-    if not os.path.exists(faiss_path) or not os.path.exists(pkl_path):
-        missing_files = []
-        if not os.path.exists(faiss_path):
-            missing_files.append(faiss_path)
-        if not os.path.exists(pkl_path):
-            missing_files.append(pkl_path)
+    missing_files = _missing_index_files(faiss_path, pkl_path)
+    if missing_files:
         print(f"FAISS files not found: {missing_files}")
         print(f"Current working directory: {os.getcwd()}")
         print(f"Looking in: {persist_directory}")
         return None
     
-    if embeddings is None:
-        embeddings = get_embeddings()
-    
     try:
-        # FAISS.load_local requires index_name to be specified
-        vectorstore = FAISS.load_local(
-            persist_directory,
-            embeddings,
-            allow_dangerous_deserialization=True,
-            index_name=index_name,
-        )
+        vectorstore = read_vectorstore(faiss_path, pkl_path, embeddings, mmap=FAISS_MMAP)
         # Check if vector store is empty
         if vectorstore.index.ntotal == 0:
             return None
+        # HNSW graph indexes: set query-time search breadth (recall vs. latency)
+        if hasattr(vectorstore.index, "hnsw"):
+            vectorstore.index.hnsw.efSearch = HNSW_EF_SEARCH
+        # IVF indexes: set number of clusters scanned per query (nprobe is not persisted)
+        if hasattr(vectorstore.index, "nprobe"):
+            vectorstore.index.nprobe = IVF_NPROBE
+        # Keep a GPU copy for batched searches (search parameters above are carried over);
+        # single queries stay on the CPU index, where they are faster
+        vectorstore.gpu_index = _index_to_gpu(vectorstore.index) if USE_FAISS_GPU else None
         return vectorstore
     except Exception as e:
         # Print error message for debugging
@@ -94,10 +335,82 @@ def load_vectorstore(
         return None
 
 
+def batch_search(vectorstore: FAISS, queries: List[str], k: int = 6) -> List[List[Document]]:
+    """
+    Retrieve documents for several queries with one embedding pass and one FAISS search
+
+    A single multi-vector search lets FAISS parallelize across queries (one query
+    searches single-threaded), and the embedding model encodes the whole batch at once.
+    Batches of at least GPU_MIN_BATCH_SIZE queries use the GPU copy of the index
+    when USE_FAISS_GPU is set (small batches lack the parallelism to gain from it).
+
+    Args:
+        vectorstore: FAISS vector store instance
+        queries: Query texts
+        k: Number of documents to retrieve per query
+
+    Returns:
+        Retrieved documents for each query (most similar first)
+    """
+    if not queries:
+        return []
+
+    vectors = np.asarray(vectorstore.embedding_function.embed_documents(queries), dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        # Same query preprocessing as FAISS.similarity_search
+        faiss.normalize_L2(vectors)
+    index = vectorstore.index
+    gpu_index = getattr(vectorstore, "gpu_index", None)
+    if gpu_index is not None and len(queries) >= GPU_MIN_BATCH_SIZE:
+        index = gpu_index
+    _, indices = index.search(vectors, k)
+
+    results = []
+    for row in indices:
+        docs = []
+        for i in row:
+            if i == -1:
+                # Fewer than k vectors in the index
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
+
+
+class CachedRetriever(BaseRetriever):
+    """Retriever wrapper that keeps recent query results in memory (repeat questions skip embedding + search)"""
+    
+    retriever: BaseRetriever
+    k: int
+    search_type: str
+    cache: Any  # LRUCache of (normalized query, k, search_type) -> documents
+    
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> List[Document]:
+        key = (re.sub(r"\s+", " ", query).strip(), self.k, self.search_type)
+        docs = self.cache.get(key)
+        if docs is None:
+            docs = self.retriever.invoke(query)
+            self.cache.set(key, tuple(docs))
+        return list(docs)
+    
+    def clear(self) -> None:
+        """Drop cached results (e.g. after the knowledge base is reloaded)"""
+        self.cache.clear()
+
+
 def create_retriever(
     vectorstore: FAISS,
     k: int = 6,
     search_type: str = "similarity",
+    cache_size: Optional[int] = None,
+    nprobe: Optional[int] = None,
 ) -> BaseRetriever:
     """
     Create retriever
@@ -106,10 +419,21 @@ def create_retriever(
         vectorstore: FAISS vector store instance
         k: Number of documents to retrieve (top-k)
         search_type: Retrieval type ("similarity" or "mmr")
+        cache_size: Cached query results (if None, use RETRIEVAL_CACHE_SIZE; 0 disables the cache).
+            The cache belongs to this retriever, so a retriever built on a reloaded vector store starts empty
+        nprobe: IVF clusters scanned per query (IVF indexes only; if None, keep IVF_NPROBE set at load).
+            This is an index setting, shared by every retriever on the same vector store
     
     Returns:
         BaseRetriever instance
     """
+    if cache_size is None:
+        cache_size = RETRIEVAL_CACHE_SIZE
+    
+    # Recall / latency trade-off of IVF-PQ indexes
+    if nprobe is not None and hasattr(vectorstore.index, "nprobe"):
+        vectorstore.index.nprobe = nprobe
+    
     search_kwargs = {"k": k}
     
     if search_type == "mmr":
@@ -125,6 +449,12 @@ def create_retriever(
             search_kwargs=search_kwargs,
         )
     
+    if cache_size > 0:
+        retriever = CachedRetriever(
+            retriever=retriever,
+            k=k,
+            search_type=search_type,
+            cache=LRUCache(maxsize=cache_size),
+        )
+    
     return retriever
-
-
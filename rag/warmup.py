@@ -0,0 +1,53 @@
+"""
+RAG Warmup Module
+Load models and run dummy inputs at startup, so the first query does not pay for it
+"""
+import threading
+import time
+from typing import Optional
+
+from langchain_community.vectorstores import FAISS
+
+from rag.retriever import get_embeddings
+from rag.reranker import get_reranker
+from utils.perf import perf_logger
+
+
+def warmup(vectorstore: Optional[FAISS] = None) -> None:
+    """
+    Load the embedding model and reranker and run one dummy input through each
+
+    The first forward pass also triggers lazy initialization (CUDA kernels,
+    ONNX Runtime graph optimization). Serverless deployments should call this
+    during init rather than on the first request.
+
+    Args:
+        vectorstore: Loaded vector store (its query embeddings are warmed; if None, the default embeddings)
+    """
+    start = time.perf_counter()
+    embeddings = vectorstore.embedding_function if vectorstore is not None else get_embeddings()
+    embeddings.embed_query("warmup")
+    get_reranker().reranker.predict([["q", "d"]])
+    perf_logger.info("Warmup took %.2fs", time.perf_counter() - start)
+
+
+def start_warmup(vectorstore: Optional[FAISS] = None) -> threading.Thread:
+    """
+    Run warmup() in a background daemon thread
+
+    Args:
+        vectorstore: Loaded vector store
+
+    Returns:
+        The started warmup thread
+    """
+    def _warmup():
+        try:
+            warmup(vectorstore)
+        except Exception as e:
+            # Warmup is best effort, the first query loads whatever is missing
+            print(f"Warmup failed: {e}")
+
+    thread = threading.Thread(target=_warmup, name="rag-warmup", daemon=True)
+    thread.start()
+    return thread
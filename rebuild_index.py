@@ -0,0 +1,104 @@
+"""
+索引重建模块
+将已有 FAISS 向量库原地转换为其他索引类型（如旧版 IndexFlatL2 -> HNSW），无需重新抓取网页或生成 Embeddings
+"""
+import os
+
+import faiss
+import numpy as np
+
+from ingest import build_faiss_index
+from config import FAISS_PERSIST_DIR, FAISS_INDEX_NAME, FAISS_INDEX_TYPE
+
+
+def extract_vectors(index: faiss.Index) -> np.ndarray:
+    """
+    从 FAISS 索引中取出全部向量（按写入顺序，与 docstore 映射一一对应）
+
+    Args:
+        index: 已加载的 FAISS 索引
+
+    Returns:
+        向量矩阵 (N, dim)；量化索引（SQ / PQ）返回的是解码后的近似向量
+    """
+    try:
+        # IVF 索引需要先建立 id -> 倒排位置的映射才能 reconstruct
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def rebuild_index(
+    persist_directory: str = None,
+    index_name: str = None,
+    index_type: str = None,
+) -> None:
+    """
+    用已有向量重建 .faiss 索引文件（.pkl docstore 保持不变）
+
+    Args:
+        persist_directory: 向量库持久化目录（如果为 None，使用 config.py 中的默认值）
+        index_name: 索引名称（如果为 None，使用 config.py 中的默认值）
+        index_type: 目标索引类型（如果为 None，使用 config.py 中的默认值）
+    """
+    if persist_directory is None:
+        persist_directory = FAISS_PERSIST_DIR
+    if index_name is None:
+        index_name = FAISS_INDEX_NAME
+    if index_type is None:
+        index_type = FAISS_INDEX_TYPE
+
+    faiss_path = os.path.join(persist_directory, f"{index_name}.faiss")
+    if not os.path.exists(faiss_path):
+        raise FileNotFoundError(f"向量库不存在: {faiss_path}，请先运行 python ingest.py")
+
+    print(f"📂 加载现有索引: {faiss_path}")
+    index = faiss.read_index(faiss_path)
+    print(f"   类型: {type(index).__name__}，向量数: {index.ntotal}，维度: {index.d}")
+    if index.ntotal == 0:
+        print("⚠️  索引为空，无需重建")
+        return
+
+    vectors = np.ascontiguousarray(extract_vectors(index), dtype=np.float32)
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        # 旧版 L2 索引存的是未归一化向量，归一化后与 normalize_embeddings=True 生成的向量一致
+        print("   旧版 L2 索引：归一化向量并转换为内积度量")
+        faiss.normalize_L2(vectors)
+
+    print(f"\n🔨 构建 {index_type} 索引...")
+    new_index = build_faiss_index(vectors, index_type)
+    new_index.add(vectors)
+
+    # 先写临时文件再替换，中途失败不会损坏现有索引
+    tmp_path = faiss_path + ".tmp"
+    faiss.write_index(new_index, tmp_path)
+    os.replace(tmp_path, faiss_path)
+    print(f"✅ 已重建索引: {type(new_index).__name__}，向量数: {new_index.ntotal}")
+    print(f"   💾 已保存到: {faiss_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="将已有 FAISS 向量库转换为其他索引类型")
+    parser.add_argument(
+        "--persist-dir",
+        type=str,
+        default=FAISS_PERSIST_DIR,
+        help="FAISS 持久化目录",
+    )
+    parser.add_argument(
+        "--index-type",
+        type=str,
+        default=FAISS_INDEX_TYPE,
+        choices=["hnsw_sq8", "hnsw", "ivfpq", "flat"],
+        help="目标索引类型",
+    )
+
+    args = parser.parse_args()
+
+    rebuild_index(
+        persist_directory=args.persist_dir,
+        index_type=args.index_type,
+    )
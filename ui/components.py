@@ -3,43 +3,83 @@ UI Components
 Component Functions Module
 """
 import streamlit as st
-from typing import List, Dict, Optional
+from string import Template
+from typing import Callable, List, Dict, Optional
+from config import IDENTITIES
 
+# ==================== HTML Templates (built once at import, not on every rerun) ====================
+_QUICK_START_HEADER = (
+    '<div class="section-title">Quick Start</div>'
+    '<div class="section-subtitle">Click the question below to get started quickly, or enter your question in the input box below.</div>'
+    '<div style="height:12px;"></div>'
+)
 
-def render_identity_tabs(selected: str) -> Optional[str]:
+_ANSWER_ACTIONS = """
+<div class="answer-actions">
+    <button>👍</button>
+    <button>👎</button>
+</div>
+"""
+
+_CHAT_MESSAGE_OPEN = Template('<div class="$msg_class">')
+
+_SOURCES_PANEL_TITLE = '<div class="panel-title">Links to <b>Document</b> and <b>Website</b> for this Response</div>'
+
+_SOURCE_CARD = Template("""
+<div class="source-card">
+    <a class="source-title" href="$url" target="_blank">
+        <span>$title</span>
+        <span style="opacity:.6;">🔗</span>
+    </a>
+    <div class="source-snippet">$snippet</div>
+</div>
+""")
+
+_SOURCE_SNIPPET_PLACEHOLDER = "This is the relevant content from the website. This is the relevant content from the website. This is the relevant content from the website."
+
+_SCROLL_INDICATOR = """
+<div style="display:flex; justify-content:center; margin-top:18px; opacity:.7; font-size:22px;">
+    ⌄
+</div>
+"""
+
+_SOURCES_EMPTY_STATE = """
+<div style="height: 480px; display:flex; align-items:center; justify-content:center;">
+    <div style="text-align:center; font-size:28px; font-weight:900; color:#1E2B55; line-height:1.25;">
+        This section will display<br/>
+        <span style="color:#2F6FEA;">links</span> to the referenced<br/>
+        <span style="color:#2F6FEA;">websites</span>.
+    </div>
+</div>
+"""
+
+
+def render_identity_tabs(
+    selected: str,
+    on_change: Optional[Callable[[str], None]] = None
+) -> Optional[str]:
     """
-    Render identity selection tabs (chip style)
+    Render identity selection tabs (one horizontal radio instead of a button per identity)
     
     Args:
         selected: Currently selected identity
+        on_change: Called with the new identity when the selection changes (before the rerun)
     
     Returns:
-        If a tab is clicked, returns the new identity string, otherwise returns None
+        If a different identity is picked, returns the new identity string, otherwise returns None
     """
-    identities = ["Not Sure", "Student Pass", "Employment Pass(EP)", "LTVP", "Others"]
-    
-    st.markdown('<div class="identity-tabs">', unsafe_allow_html=True)
-    
-    cols = st.columns(len(identities), gap="small")
-    new_selected = None
-    
-    for i, identity in enumerate(identities):
-        with cols[i]:
-            is_active = identity == selected
-            button_key = f"identity_{i}"
-            
-            # Use button to achieve chip effect
-            # CSS will set styles based on data-active attribute (by checking session_state)
-            if st.button(
-                identity,
-                key=button_key,
-                use_container_width=True
-            ):
-                new_selected = identity
-    
-    st.markdown('</div>', unsafe_allow_html=True)
+    # A single widget; Streamlit already reruns on change, so no st.rerun() is needed
+    choice = st.radio(
+        "Identity",
+        IDENTITIES,
+        horizontal=True,
+        index=IDENTITIES.index(selected) if selected in IDENTITIES else 0,
+        label_visibility="collapsed",
+        key="user_identity_radio",
+        on_change=(lambda: on_change(st.session_state.user_identity_radio)) if on_change else None
+    )
     
-    return new_selected
+    return choice if choice != selected else None
 
 
 def render_quick_start_chips(example_questions: List[str]) -> Optional[str]:
@@ -52,14 +92,8 @@ def render_quick_start_chips(example_questions: List[str]) -> Optional[str]:
     Returns:
         If a chip is clicked, returns the question text, otherwise returns None
     """
-    # Title
-    st.markdown('<div class="section-title">Quick Start</div>', unsafe_allow_html=True)
-    st.markdown(
-        '<div class="section-subtitle">Click the question below to get started quickly, or enter your question in the input box below.</div>',
-        unsafe_allow_html=True
-    )
-    
-    st.markdown('<div style="height:12px;"></div>', unsafe_allow_html=True)
+    # Title, subtitle and spacing in one markdown call
+    st.markdown(_QUICK_START_HEADER, unsafe_allow_html=True)
     
     # First two questions
     if len(example_questions) >= 2:
@@ -99,22 +133,13 @@ def render_chat_message(role: str, content: str, show_actions: bool = False):
         show_actions: Whether to show action buttons (like/dislike)
     """
     msg_class = "msg-user" if role == "user" else "msg-assistant"
+    actions = _ANSWER_ACTIONS if role == "assistant" and show_actions else ""
     
-    st.markdown(f'<div class="{msg_class}">', unsafe_allow_html=True)
+    st.markdown(_CHAT_MESSAGE_OPEN.substitute(msg_class=msg_class), unsafe_allow_html=True)
+    # User input and LLM output stay plain Markdown, never raw HTML
     st.markdown(content)
-    
-    if role == "assistant" and show_actions:
-        st.markdown(
-            """
-            <div class="answer-actions">
-                <button>👍</button>
-                <button>👎</button>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-    
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Actions and the closing tag are static markup, sent in one call
+    st.markdown(actions + '</div>', unsafe_allow_html=True)
 
 
 def render_sources_panel(sources: List[Dict[str, str]]):
@@ -124,57 +149,25 @@ def render_sources_panel(sources: List[Dict[str, str]]):
     Args:
         sources: List of sources, each element contains {"title": str, "url": str, "snippet": str}
     """
-    st.markdown('<div class="sources-wrap">', unsafe_allow_html=True)
-    
-    st.markdown(
-        '<div class="panel-title">Links to <b>Document</b> and <b>Website</b> for this Response</div>',
-        unsafe_allow_html=True
-    )
+    # Build the whole panel as one string so only one markdown message is sent
+    parts = ['<div class="sources-wrap">', _SOURCES_PANEL_TITLE]
     
     if sources and len(sources) > 0:
         for source in sources:
-            title = source.get("title", "Link to website")
-            url = source.get("url", "#")
-            snippet = source.get("snippet", "This is the relevant content from the website. This is the relevant content from the website. This is the relevant content from the website.")
-            
-            st.markdown(
-                f"""
-                <div class="source-card">
-                    <a class="source-title" href="{url}" target="_blank">
-                        <span>{title}</span>
-                        <span style="opacity:.6;">🔗</span>
-                    </a>
-                    <div class="source-snippet">{snippet}</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+            parts.append(_SOURCE_CARD.substitute(
+                title=source.get("title", "Link to website"),
+                url=source.get("url", "#"),
+                snippet=source.get("snippet", _SOURCE_SNIPPET_PLACEHOLDER),
+            ))
         
         # Scroll indicator
-        st.markdown(
-            """
-            <div style="display:flex; justify-content:center; margin-top:18px; opacity:.7; font-size:22px;">
-                ⌄
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        parts.append(_SCROLL_INDICATOR)
     else:
         # Empty state: show placeholder text (as per reference UI)
-        st.markdown(
-            """
-            <div style="height: 480px; display:flex; align-items:center; justify-content:center;">
-                <div style="text-align:center; font-size:28px; font-weight:900; color:#1E2B55; line-height:1.25;">
-                    This section will display<br/>
-                    <span style="color:#2F6FEA;">links</span> to the referenced<br/>
-                    <span style="color:#2F6FEA;">websites</span>.
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-    
-    st.markdown('</div>', unsafe_allow_html=True)
+        parts.append(_SOURCES_EMPTY_STATE)
+    
+    parts.append('</div>')
+    st.markdown("".join(parts), unsafe_allow_html=True)
 
 
 def normalize_sources(raw_citations: List[Dict]) -> List[Dict[str, str]]:
@@ -3,26 +3,86 @@ UI Layout
 Simple Streamlit UI Layout Module
 """
 import streamlit as st
-from typing import Optional
+from typing import Callable, Optional
 from config import EXAMPLE_QUESTIONS
+from ui.components import render_identity_tabs
 
+# ==================== Static Content (built once at import, not on every rerun) ====================
+_FUNCTION_DESCRIPTION = """
+**Supported Issues:**
+- Rental Eligibility (Student Pass / EP / LTVP, etc.)
+- Differences in HDB and Private Residential Rental Rules
+- Minimum Lease Term and Occupancy Restrictions
+- Rental Process (Viewing → Contract → Deposit → Move-in)
+- Official Risk Warnings and Consequences of Violations
+- Tenancy Renewal and Contract Terms
 
-def render_app():
-    """Render entire application (main entry)"""
+**Not Supported:**
+- Rent Price Forecasting
+- Legal Liability Adjudication
+- Case-by-Case Dispute Resolution
+"""
+
+_DISCLAIMER = """
+**⚠️ Disclaimer:**
+
+This system only provides information aggregation and citation and does not constitute legal advice.
+All information is derived from official documents, but the latest policies are not guaranteed.
+For important decisions, please consult official agencies (HDB, CEA, URA).
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; color: #666; font-size: 0.9em;">
+🏠 Singapore Rental RAG Assistant | Powered by LangChain + DeepSeek API | 
+Data sources: <b>HDB</b>, <b>CEA</b>, <b>URA</b> official websites
+</div>
+"""
+
+
+def _queue_question(question: str):
+    """Append a user question and flag it for app.py (widget callback, runs before the script reruns)"""
+    st.session_state.messages.append({
+        "role": "user",
+        "content": question
+    })
+    st.session_state.last_user_idx = len(st.session_state.messages) - 1
+    st.session_state.trigger_send = True
+
+
+def _submit_chat_input():
+    """chat_input on_submit callback"""
+    question = st.session_state.get("chat_question")
+    if question:
+        _queue_question(question)
+
+
+def _set_identity(identity: str):
+    """Identity tabs on_change callback"""
+    st.session_state.user_identity = identity
+
+
+def _request_regenerate():
+    """Regenerate button on_click callback"""
+    st.session_state.trigger_regenerate = True
+
+
+def render_app(answer_pending: Optional[Callable[[], None]] = None):
+    """
+    Render entire application (main entry)
+    
+    Args:
+        answer_pending: Called right after the chat history, to stream the answer
+            to the newest question in place (provided by app.py)
+    """
     # Title
     st.title("🏠 Singapore Rental RAG Assistant")
     
     # Identity selection
     st.subheader("Select Your Identity")
-    identities = ["Not Sure", "Student Pass", "Employment Pass(EP)", "LTVP", "Others"]
-    selected_identity = st.radio(
-        "Identity",
-        identities,
-        horizontal=True,
-        index=identities.index(st.session_state.get("user_identity", "Not Sure")),
-        label_visibility="collapsed"
+    render_identity_tabs(
+        st.session_state.get("user_identity", "Not Sure"),
+        on_change=_set_identity
     )
-    st.session_state.user_identity = selected_identity
     
     st.divider()
     
@@ -46,30 +106,11 @@ def render_app():
         st.divider()
         
         st.header("Function Description")
-        st.markdown("""
-        **Supported Issues:**
-        - Rental Eligibility (Student Pass / EP / LTVP, etc.)
-        - Differences in HDB and Private Residential Rental Rules
-        - Minimum Lease Term and Occupancy Restrictions
-        - Rental Process (Viewing → Contract → Deposit → Move-in)
-        - Official Risk Warnings and Consequences of Violations
-        - Tenancy Renewal and Contract Terms
-        
-        **Not Supported:**
-        - Rent Price Forecasting
-        - Legal Liability Adjudication
-        - Case-by-Case Dispute Resolution
-        """)
+        st.markdown(_FUNCTION_DESCRIPTION)
         
         st.divider()
         
-        st.markdown("""
-        **⚠️ Disclaimer:**
-        
-        This system only provides information aggregation and citation and does not constitute legal advice.
-        All information is derived from official documents, but the latest policies are not guaranteed.
-        For important decisions, please consult official agencies (HDB, CEA, URA).
-        """)
+        st.markdown(_DISCLAIMER)
     
     # Quick Start
     st.subheader("Quick Start")
@@ -79,16 +120,18 @@ def render_app():
     cols = st.columns(2)
     for i, question in enumerate(EXAMPLE_QUESTIONS[:2]):
         with cols[i % 2]:
-            if st.button(question, key=f"example_{i}", use_container_width=True):
-                st.session_state.draft_question = question
-                st.rerun()
+            st.button(
+                question, key=f"example_{i}", use_container_width=True,
+                on_click=_queue_question, args=(question,)
+            )
     
     if len(EXAMPLE_QUESTIONS) > 2:
         with st.expander("More example questions"):
             for i, question in enumerate(EXAMPLE_QUESTIONS[2:], start=2):
-                if st.button(question, key=f"example_{i}", use_container_width=True):
-                    st.session_state.draft_question = question
-                    st.rerun()
+                st.button(
+                    question, key=f"example_{i}", use_container_width=True,
+                    on_click=_queue_question, args=(question,)
+                )
     
     st.divider()
     
@@ -100,45 +143,27 @@ def render_app():
         with st.chat_message(role):
             st.markdown(content)
     
-    # Handle trigger_send and trigger_regenerate will be handled in app.py
+    # trigger_send and trigger_regenerate are handled in app.py: widget callbacks run
+    # before the next script run, so the queued question is answered in that same run
+    # (no extra st.rerun() per turn), streamed here below the history
+    if answer_pending is not None:
+        answer_pending()
     
     # Input area
-    draft = st.session_state.get("draft_question", "")
-    question = st.chat_input(
-        "Please enter your question."
+    st.chat_input(
+        "Please enter your question.",
+        key="chat_question",
+        on_submit=_submit_chat_input
     )
     
-    if question:
-        st.session_state.messages.append({
-            "role": "user",
-            "content": question
-        })
-        st.session_state.draft_question = ""
-        st.session_state.trigger_send = True
-        st.rerun()
-    
-    # Also handle draft_question if set
-    if draft and not question:
-        st.session_state.draft_question = ""
-        st.session_state.messages.append({
-            "role": "user",
-            "content": draft
-        })
-        st.session_state.trigger_send = True
-        st.rerun()
-    
     # Regenerate button
     if messages:
-        last_user_msg = None
-        for msg in reversed(messages):
-            if msg.get("role") == "user":
-                last_user_msg = msg.get("content")
-                break
-        
-        if last_user_msg and messages[-1].get("role") == "assistant":
-            if st.button("↻ Regenerate response", use_container_width=True):
-                st.session_state.trigger_regenerate = True
-                st.rerun()
+        # Index maintained when a user message is appended (no scan over the history)
+        if st.session_state.get("last_user_idx") is not None and messages[-1].get("role") == "assistant":
+            st.button(
+                "↻ Regenerate response", use_container_width=True,
+                on_click=_request_regenerate
+            )
     
     # Sources panel
     sources = st.session_state.get("sources", [])
@@ -157,12 +182,4 @@ def render_app():
     
     # Footer
     st.divider()
-    st.markdown(
-        """
-        <div style="text-align: center; color: #666; font-size: 0.9em;">
-        🏠 Singapore Rental RAG Assistant | Powered by LangChain + DeepSeek API | 
-        Data sources: <b>HDB</b>, <b>CEA</b>, <b>URA</b> official websites
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
@@ -2,8 +2,21 @@
 Web Page Content Loader Module
 Extract web page content using trafilatura or readability-lxml
 """
+import asyncio
+import httpx
+import lxml.etree
+import lxml.html
 import requests
-from typing import Optional, Dict
+import requests.certs
+import ssl
+import threading
+import time
+from collections import defaultdict
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from typing import Optional, Dict, List, Mapping, Tuple, Union
 from langchain_core.documents import Document
 from datetime import datetime
 from urllib.parse import urlparse
@@ -20,8 +33,169 @@ try:
 except ImportError:
     READABILITY_AVAILABLE = False
 
+try:
+    import pycurl
+    PYCURL_AVAILABLE = True
+except ImportError:
+    PYCURL_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
 from bs4 import BeautifulSoup
 
+from utils.cache import LRUCache
+
+# Default request headers (pretend to be a browser)
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+# Shared session: repeat fetches to the same host reuse kept-alive connections (skips TCP + TLS handshakes)
+# Retries are handled by load_webpage, so the adapter itself never retries
+_SESSION = requests.Session()
+_SESSION.headers.update(DEFAULT_HEADERS)
+_adapter = HTTPAdapter(pool_connections=20, pool_maxsize=100, max_retries=0)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+
+# TLS fallback for servers that only negotiate legacy ciphers: built once, certificates are still verified
+_RELAXED_CIPHERS = "DEFAULT@SECLEVEL=1"
+_RELAXED_SSL_CONTEXT = ssl.create_default_context(cafile=requests.certs.where())
+_RELAXED_SSL_CONTEXT.set_ciphers(_RELAXED_CIPHERS)
+
+
+class _RelaxedTLSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools use the shared relaxed SSLContext"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = _RELAXED_SSL_CONTEXT
+        return super().init_poolmanager(*args, **kwargs)
+
+
+_RELAXED_TLS_SESSION = requests.Session()
+_RELAXED_TLS_SESSION.headers.update(DEFAULT_HEADERS)
+_RELAXED_TLS_SESSION.mount("https://", _RelaxedTLSAdapter(pool_connections=20, pool_maxsize=100, max_retries=0))
+
+
+# Tags that never hold the main text
+_NOISE_TAGS = ["script", "style", "nav", "header", "footer", "aside"]
+
+# Main-content containers, in order of preference (CSS selector form)
+_CONTENT_SELECTORS = ["main", "article", "div.content", "div.main-content", "div#content"]
+
+# The same containers as soup.find() arguments
+_BS4_CONTENT_CANDIDATES = [
+    ("main", {}),
+    ("article", {}),
+    ("div", {"class_": "content"}),
+    ("div", {"class_": "main-content"}),
+    ("div", {"id": "content"}),
+]
+
+
+# Text nodes outside noise tags (lxml XPath, read-only so the tree stays usable for trafilatura)
+_TEXT_XPATH = ".//text()[not(" + " or ".join(f"ancestor::{tag}" for tag in _NOISE_TAGS) + ")]"
+
+
+def _extract_article_fast(tree: lxml.html.HtmlElement) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract title and text of the first <article> long enough to be the main content
+    
+    Returns:
+        (title, text), both None if the page has no such article
+    """
+    for article in tree.xpath("//article"):
+        # Same text layout as BeautifulSoup get_text(separator="\n", strip=True)
+        text = "\n".join(part.strip() for part in article.xpath(_TEXT_XPATH) if part.strip())
+        if len(text) > 500:  # Ensure content is long enough
+            og_title = tree.xpath("//meta[@property='og:title']/@content")
+            title = og_title[0].strip() if og_title else (tree.findtext(".//title") or "").strip()
+            return title or None, text
+    return None, None
+
+
+def _extract_with_selectolax(html_content: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract title and main text with selectolax (lexbor C parser, much faster than BeautifulSoup)
+    
+    Returns:
+        (title, text), either may be None
+    """
+    tree = LexborHTMLParser(html_content)
+    # Remove script and style tags
+    for node in tree.css(",".join(_NOISE_TAGS)):
+        node.decompose()
+    
+    # Extract title
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node else None
+    
+    # Extract main text (first preferred container that is long enough)
+    for selector in _CONTENT_SELECTORS:
+        node = tree.css_first(selector)
+        if node:
+            text = node.text(separator="\n", strip=True)
+            if len(text) > 500:  # Ensure content is long enough
+                return title, text
+    
+    # If specific container not found, use body
+    body = tree.css_first("body")
+    return title, body.text(separator="\n", strip=True) if body else None
+
+
+def _extract_with_bs4(html_content: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract title and main text with BeautifulSoup
+    
+    Returns:
+        (title, text), either may be None
+    """
+    soup = BeautifulSoup(html_content, "lxml")
+    # Remove script and style tags
+    for script in soup(_NOISE_TAGS):
+        script.decompose()
+    
+    # Extract title
+    title = None
+    title_tag = soup.find("title")
+    if title_tag:
+        title = title_tag.get_text().strip()
+    
+    # Extract main text (probe containers lazily, stop at the first long enough one)
+    for name, attrs in _BS4_CONTENT_CANDIDATES:
+        container = soup.find(name, **attrs)
+        if container:
+            text = container.get_text(separator="\n", strip=True)
+            if len(text) > 500:  # Ensure content is long enough
+                return title, text
+    
+    # If specific container not found, use body
+    body = soup.find("body")
+    return title, body.get_text(separator="\n", strip=True) if body else None
+
+
+# Extracted pages with their HTTP validators: url -> (Document, ETag, Last-Modified)
+_PAGE_CACHE = LRUCache(maxsize=512, ttl=3600)
+
+
+# libcurl fetch path (used when pycurl is installed): one handle per thread, libcurl error codes for TLS failures
+_curl_local = threading.local()
+_CURL_SSL_ERRORS = {35, 51, 53, 54, 58, 59, 60, 64, 66, 77, 80, 82, 83, 90, 91}
+
+
+def close_session():
+    """Close pooled connections of the shared HTTP sessions (and this thread's Curl handle)"""
+    _SESSION.close()
+    _RELAXED_TLS_SESSION.close()
+    curl = getattr(_curl_local, "curl", None)
+    if curl is not None:
+        curl.close()
+        _curl_local.curl = None
+
 
 def load_webpage(url: str, headers: Optional[Dict[str, str]] = None) -> Document:
     """
@@ -29,7 +203,7 @@ def load_webpage(url: str, headers: Optional[Dict[str, str]] = None) -> Document
     
     Args:
         url: Web page URL
-        headers: Request headers (optional, default uses browser User-Agent)
+        headers: Extra request headers (optional, merged over the session's browser User-Agent)
     
     Returns:
         LangChain Document object containing:
@@ -39,83 +213,291 @@ def load_webpage(url: str, headers: Optional[Dict[str, str]] = None) -> Document
     Raises:
         Exception: If web page loading fails or content extraction fails
     """
-    # Default request headers (pretend to be a browser)
-    if headers is None:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
+    # Pages seen before are revalidated with a conditional GET (304 skips download and parsing)
+    cached = _PAGE_CACHE.get(url)
+    if cached is not None:
+        _, etag, last_modified = cached
+        conditional = {}
+        if etag:
+            conditional["If-None-Match"] = etag
+        if last_modified:
+            conditional["If-Modified-Since"] = last_modified
+        headers = {**(headers or {}), **conditional}
     
     # Send HTTP request (with retry mechanism)
+    fetch = _fetch_page_pycurl if PYCURL_AVAILABLE else _fetch_page
     max_retries = 3
     html_content = None
+    tree = None
+    response_headers = None
+    
+    relaxed_tls = False
     
     for attempt in range(max_retries):
         try:
-            response = requests.get(
-                url, 
-                headers=headers, 
-                timeout=30,
-                verify=True,  # Verify SSL certificate
-                allow_redirects=True,
-            )
-            response.raise_for_status()
-            html_content = response.text
+            html_content, tree, response_headers = fetch(url, headers, relaxed_tls=relaxed_tls)
             break  # Exit loop on success
         except requests.exceptions.SSLError as e:
             if attempt < max_retries - 1:
-                # If this is the last attempt, try disabling SSL verification (not recommended, but as a fallback)
-                if attempt == max_retries - 1:
-                    try:
-                        response = requests.get(
-                            url, 
-                            headers=headers, 
-                            timeout=30,
-                            verify=False,  # Disable SSL verification on last attempt
-                            allow_redirects=True,
-                        )
-                        response.raise_for_status()
-                        html_content = response.text
-                        break
-                    except Exception as e2:
-                        raise Exception(f"Failed to load web page {url} (SSL error, retried {max_retries} times): {e2}")
-                else:
-                    # Wait before retrying
-                    import time
-                    time.sleep(2 ** attempt)  # Exponential backoff: 2s, 4s
+                if not relaxed_tls:
+                    # Handshake failures usually mean a server that only offers legacy ciphers:
+                    # retry at once with the relaxed context (the certificate is still verified)
+                    relaxed_tls = True
                     continue
+                # Wait before retrying
+                time.sleep(2 ** attempt)  # Exponential backoff
+                continue
             else:
                 raise Exception(f"Failed to load web page {url} (SSL error, retried {max_retries} times): {e}")
         except Exception as e:
             if attempt < max_retries - 1:
-                import time
                 time.sleep(2 ** attempt)  # Exponential backoff
                 continue
             else:
                 raise Exception(f"Failed to load web page {url} (retried {max_retries} times): {e}")
     
+    if html_content is None and response_headers is not None and cached is not None:
+        # 304 Not Modified: the previous extraction is still current
+        return _copy_document(cached[0])
+    
     if html_content is None:
         raise Exception(f"Failed to load web page {url}")
     
-    # Extract main text content (prefer trafilatura)
+    doc = extract_document(html_content, url, tree=tree)
+    etag = response_headers.get("ETag")
+    last_modified = response_headers.get("Last-Modified")
+    if etag or last_modified:
+        _PAGE_CACHE.set(url, (doc, etag, last_modified))
+    # Callers may modify the returned Document, the cached one stays untouched
+    return _copy_document(doc)
+
+
+def _copy_document(doc: Document) -> Document:
+    """Copy of a cached Document, stamped with the current fetch date"""
+    return Document(
+        page_content=doc.page_content,
+        metadata={**doc.metadata, "fetch_date": datetime.now().isoformat()},
+    )
+
+
+class _PageStream:
+    """Collects a response body while lxml's feed parser builds the DOM from the same chunks"""
+
+    def __init__(self, encoding: Optional[str]):
+        """
+        Args:
+            encoding: Response charset from the headers (None: detected from the body on close,
+                like response.text's apparent_encoding fallback; the DOM is then parsed later)
+        """
+        self.encoding = encoding
+        self._parser = None
+        if encoding is not None:
+            try:
+                self._parser = lxml.html.HTMLParser(encoding=encoding)
+            except LookupError:
+                pass  # Charset unknown to libxml2, extractors parse the decoded HTML instead
+        self._chunks = []
+
+    def feed(self, chunk: bytes) -> None:
+        if self._parser is not None:
+            self._parser.feed(chunk)
+        self._chunks.append(chunk)
+
+    def close(self) -> Tuple[str, Optional[lxml.html.HtmlElement]]:
+        """
+        Returns:
+            (html_content, tree); tree is None if lxml could not build a document
+            or the charset had to be detected
+        """
+        body = b"".join(self._chunks)
+        encoding = self.encoding
+        if encoding is None:
+            # Same detection as requests' Response.apparent_encoding
+            encoding = (chardet.detect(body)["encoding"] if chardet is not None else None) or "utf-8"
+        tree = None
+        if self._parser is not None:
+            try:
+                tree = self._parser.close()
+            except lxml.etree.LxmlError:
+                pass  # Empty or unparseable body, extractors fall back to the raw HTML
+        try:
+            html_content = body.decode(encoding, errors="replace")
+        except LookupError:
+            # Unknown charset name, same fallback as response.text
+            html_content = body.decode("utf-8", errors="replace")
+        return html_content, tree
+
+
+def _fetch_page(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    relaxed_tls: bool = False,
+) -> Tuple[Optional[str], Optional[lxml.html.HtmlElement], Mapping[str, str]]:
+    """
+    Download a page, parsing it while the body streams in
+    
+    Chunks are fed to lxml's feed parser as they arrive, so the DOM is
+    built during the download instead of after it. relaxed_tls uses the
+    session whose TLS context also accepts legacy ciphers.
+    
+    Returns:
+        (html_content, tree, response headers); tree is None if lxml could not build
+        a document, html_content and tree are None on 304 Not Modified
+    
+    Raises:
+        requests.exceptions.RequestException: On connection errors or HTTP error status
+    """
+    session = _RELAXED_TLS_SESSION if relaxed_tls else _SESSION
+    with session.get(
+        url,
+        headers=headers,
+        timeout=30,
+        allow_redirects=True,
+        stream=True,
+    ) as response:
+        response.raise_for_status()
+        if response.status_code == 304:
+            return None, None, response.headers
+        # Header charset as with response.text (ISO-8859-1 default for text/*, detected if absent)
+        stream = _PageStream(response.encoding)
+        for chunk in response.iter_content(chunk_size=32768):
+            stream.feed(chunk)
+    
+    return (*stream.close(), response.headers)
+
+
+def _fetch_page_pycurl(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    relaxed_tls: bool = False,
+) -> Tuple[Optional[str], Optional[lxml.html.HtmlElement], Mapping[str, str]]:
+    """
+    Download a page with libcurl, feeding the body to lxml from curl's write callback
+    
+    Same contract as _fetch_page (errors are raised as the matching requests
+    exceptions, so load_webpage's retry logic is unchanged). Each thread keeps
+    one Curl handle, whose connection cache provides keep-alive.
+    """
+    curl = getattr(_curl_local, "curl", None)
+    if curl is None:
+        curl = _curl_local.curl = pycurl.Curl()
+    else:
+        curl.reset()  # Clears options, keeps the connection cache
+    
+    response_headers = CaseInsensitiveDict()
+    stream = None
+    
+    def on_header(line: bytes):
+        line = line.decode("iso-8859-1").strip()
+        if line.startswith("HTTP/"):
+            response_headers.clear()  # Status line of a new response (after a redirect)
+        elif ":" in line:
+            name, value = line.split(":", 1)
+            response_headers[name.strip()] = value.strip()
+    
+    def on_body(chunk: bytes):
+        nonlocal stream
+        if stream is None:
+            # Headers are complete once the body starts
+            stream = _PageStream(get_encoding_from_headers(response_headers))
+        stream.feed(chunk)
+    
+    request_headers = {**DEFAULT_HEADERS, **(headers or {})}
+    curl.setopt(pycurl.URL, url)
+    curl.setopt(pycurl.HTTPHEADER, [f"{name}: {value}" for name, value in request_headers.items()])
+    curl.setopt(pycurl.FOLLOWLOCATION, True)
+    curl.setopt(pycurl.MAXREDIRS, 30)
+    curl.setopt(pycurl.ACCEPT_ENCODING, "")  # Any encoding libcurl supports (gzip, deflate, ...)
+    curl.setopt(pycurl.TCP_KEEPALIVE, 1)
+    curl.setopt(pycurl.CONNECTTIMEOUT, 30)
+    # Abort when the transfer stalls for 30s (like the requests read timeout)
+    curl.setopt(pycurl.LOW_SPEED_LIMIT, 1)
+    curl.setopt(pycurl.LOW_SPEED_TIME, 30)
+    if relaxed_tls:
+        curl.setopt(pycurl.SSL_CIPHER_LIST, _RELAXED_CIPHERS)
+    curl.setopt(pycurl.HEADERFUNCTION, on_header)
+    curl.setopt(pycurl.WRITEFUNCTION, on_body)
+    
+    try:
+        curl.perform()
+    except pycurl.error as e:
+        if e.args[0] in _CURL_SSL_ERRORS:
+            raise requests.exceptions.SSLError(str(e))
+        raise requests.exceptions.ConnectionError(str(e))
+    
+    status = curl.getinfo(pycurl.RESPONSE_CODE)
+    if status >= 400:
+        raise requests.exceptions.HTTPError(f"{status} Error for url: {url}")
+    if status == 304:
+        return None, None, response_headers
+    if stream is None:
+        stream = _PageStream(get_encoding_from_headers(response_headers))
+    return (*stream.close(), response_headers)
+
+
+def _parse_html(html_content: str) -> Optional[lxml.html.HtmlElement]:
+    """Parse HTML into an lxml document tree (None if lxml cannot parse it)"""
+    try:
+        # Bytes with an explicit charset: lxml rejects str input that carries an XML encoding declaration
+        return lxml.html.document_fromstring(
+            html_content.encode("utf-8"),
+            parser=lxml.html.HTMLParser(encoding="utf-8"),
+        )
+    except (ValueError, lxml.etree.LxmlError):
+        return None
+
+
+def extract_document(
+    html_content: str,
+    url: str,
+    tree: Optional[lxml.html.HtmlElement] = None,
+) -> Document:
+    """
+    Extract main text from downloaded HTML (CPU-bound, no network access)
+    
+    Args:
+        html_content: Raw HTML of the page
+        url: Page URL (stored in metadata, used as title fallback)
+        tree: lxml tree already parsed from html_content (optional, parsed here if None)
+    
+    Returns:
+        LangChain Document object (same format as load_webpage)
+    
+    Raises:
+        Exception: If content extraction fails
+    """
+    # Extract main text content (cheapest extractor first, then prefer trafilatura)
     text_content = None
     title = None
     
+    # Parse once; the article fast path and trafilatura share the tree
+    if tree is None:
+        tree = _parse_html(html_content)
+    
+    # Method 0: Pages with a substantial <article> skip the full extractors
+    if tree is not None:
+        title, text_content = _extract_article_fast(tree)
+    
     # Method 1: Use trafilatura (recommended)
-    if TRAFILATURA_AVAILABLE:
+    if not text_content and TRAFILATURA_AVAILABLE:
         try:
+            source = tree if tree is not None else html_content
+            # Metadata first: extract() prunes the tree it is given
+            try:
+                metadata = trafilatura.extract_metadata(source)
+            except Exception:
+                metadata = None  # A missing title must not cost the main text
             # Use trafilatura to extract, configured to extract more content
             text_content = trafilatura.extract(
-                html_content,
+                source,
                 include_comments=False,
                 include_tables=True,
                 include_images=False,
                 include_links=False,
             )
-            if text_content:
-                # trafilatura can also extract title
-                metadata_dict = trafilatura.extract_metadata(html_content)
-                if metadata_dict:
-                    title = metadata_dict.get("title", "")
+            if text_content and metadata:
+                # trafilatura can also extract title (a dict in old versions, a Document object since 1.0)
+                title = metadata.get("title", "") if isinstance(metadata, dict) else metadata.title
         except Exception:
             pass
     
@@ -128,43 +510,15 @@ def load_webpage(url: str, headers: Optional[Dict[str, str]] = None) -> Document
         except Exception:
             pass
     
-    # Method 3: Use BeautifulSoup as fallback
+    # Method 3: Parse the DOM directly (selectolax if installed, else BeautifulSoup)
     if not text_content:
         try:
-            soup = BeautifulSoup(html_content, "lxml")
-            # Remove script and style tags
-            for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
-                script.decompose()
-            
-            # Extract title
-            title_tag = soup.find("title")
-            if title_tag:
-                title = title_tag.get_text().strip()
-            
-            # Extract main text (try multiple selectors)
-            main_content = None
-            selectors = [
-                soup.find("main"),
-                soup.find("article"),
-                soup.find("div", class_="content"),
-                soup.find("div", class_="main-content"),
-                soup.find("div", id="content"),
-            ]
-            
-            for selector in selectors:
-                if selector:
-                    text = selector.get_text(separator="\n", strip=True)
-                    if len(text) > 500:  # Ensure content is long enough
-                        main_content = selector
-                        break
-            
-            if main_content:
-                text_content = main_content.get_text(separator="\n", strip=True)
+            if SELECTOLAX_AVAILABLE:
+                dom_title, text_content = _extract_with_selectolax(html_content)
             else:
-                # If specific container not found, use body
-                body = soup.find("body")
-                if body:
-                    text_content = body.get_text(separator="\n", strip=True)
+                dom_title, text_content = _extract_with_bs4(html_content)
+            if dom_title:
+                title = dom_title
         except Exception:
             pass
     
@@ -174,12 +528,13 @@ def load_webpage(url: str, headers: Optional[Dict[str, str]] = None) -> Document
     # Clean text
     text_content = text_content.strip()
     
-    # If title not extracted, use URL
+    parsed_url = urlparse(url)
+    
+    # If title not extracted, use the last path segment (query and fragment excluded), else the domain
     if not title:
-        title = url.split("/")[-1] or url
+        title = parsed_url.path.rsplit("/", 1)[-1] or parsed_url.netloc or url
     
     # Extract domain as source
-    parsed_url = urlparse(url)
     source = parsed_url.netloc
     
     # Create LangChain Document
@@ -196,6 +551,65 @@ def load_webpage(url: str, headers: Optional[Dict[str, str]] = None) -> Document
     return doc
 
 
+async def _afetch_html(
+    client: httpx.AsyncClient,
+    url: str,
+    host_limits: Dict[str, asyncio.Semaphore],
+    max_retries: int = 3,
+) -> str:
+    """Download one page, retrying with plain exponential backoff (1s, 2s, ...)"""
+    async with host_limits[urlparse(url).netloc]:
+        for attempt in range(max_retries):
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+                return response.text
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    continue
+                raise Exception(f"Failed to load web page {url} (retried {max_retries} times): {e}")
 
 
-
+async def aload_webpages(
+    urls: List[str],
+    headers: Optional[Dict[str, str]] = None,
+    max_connections: int = 20,
+    max_per_host: int = 4,
+) -> List[Union[Document, Exception]]:
+    """
+    Load many web pages concurrently over one pooled async HTTP client
+    
+    Downloads overlap on the event loop; text extraction runs in the default
+    thread pool so parsing one page overlaps with downloading the next.
+    
+    Each page gets a plain 3-try exponential backoff. Unlike load_webpage there is
+    no relaxed-TLS retry, no _PAGE_CACHE and no conditional GET: every call downloads
+    every page in full.
+    
+    Args:
+        urls: Web page URLs
+        headers: Extra request headers (optional, merged over the browser User-Agent)
+        max_connections: Maximum open connections in total
+        max_per_host: Maximum concurrent requests to the same host
+    
+    Returns:
+        One entry per URL, in input order: the Document, or the Exception raised for that URL
+    """
+    loop = asyncio.get_running_loop()
+    host_limits = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+    
+    async def load_one(client: httpx.AsyncClient, url: str) -> Document:
+        html_content = await _afetch_html(client, url, host_limits)
+        return await loop.run_in_executor(None, extract_document, html_content, url)
+    
+    async with httpx.AsyncClient(
+        headers={**DEFAULT_HEADERS, **(headers or {})},
+        timeout=30,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections),
+    ) as client:
+        return await asyncio.gather(
+            *(load_one(client, url) for url in urls),
+            return_exceptions=True,
+        )
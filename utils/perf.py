@@ -0,0 +1,19 @@
+"""
+Performance Logging Utility Module
+Shared "rag.perf" logger for pipeline timings, silent unless RAG_PERF_LOG enables it
+"""
+import logging
+
+from config import RAG_PERF_LOG
+
+perf_logger = logging.getLogger("rag.perf")
+# Unknown level names (e.g. "1") fall back to WARNING instead of failing the import
+_level = logging.getLevelName(RAG_PERF_LOG)
+perf_logger.setLevel(_level if isinstance(_level, int) else logging.WARNING)
+
+# Timings go to stderr even if the host app configured no logging
+if not perf_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("[Performance] %(message)s"))
+    perf_logger.addHandler(_handler)
+    perf_logger.propagate = False
@@ -4,6 +4,23 @@ Used to clean and normalize text extracted from web pages
 """
 import re
 
+# Optional Cython build of clean_text (see utils/_text_cleaner_c.pyx), same output in a single pass
+try:
+    from utils._text_cleaner_c import clean_text_fast
+except ImportError:
+    clean_text_fast = None
+
+# Compiled once at import (clean_text runs on every ingested document)
+_RE_EOL = re.compile(r'\r\n?')          # Windows (\r\n) and old Mac (\r) line breaks
+_RE_HSPACE = re.compile(r'[ \t]+')
+_RE_NL3 = re.compile(r'\n{3,}')
+_RE_SPACES = re.compile(r' +')
+# Whitespace other than \n around a line break (same characters str.strip() removes)
+_RE_LINE_TRIM = re.compile(r'[^\S\n]*\n[^\S\n]*')
+# Anything one of the passes below would change (text without a match only needs the final strip)
+_RE_DIRTY = re.compile(r'\r|\t| {2}|\n{3}|[^\S\n]\n|\n[^\S\n]')
+_RE_WS_DIRTY = re.compile(r' {2}|\n{3}')
+
 
 def clean_text(text: str) -> str:
     """
@@ -18,21 +35,26 @@ def clean_text(text: str) -> str:
     if not text:
         return ""
     
+    if clean_text_fast is not None:
+        return clean_text_fast(text)
+    
+    # Already clean text (common for trafilatura output) skips the substitution passes
+    if _RE_DIRTY.search(text) is None:
+        return text.strip()
+    
     # Remove excessive whitespace (but keep line breaks as they may contain important structure)
     # First normalize line breaks
-    text = re.sub(r'\r\n', '\n', text)  # Windows line break
-    text = re.sub(r'\r', '\n', text)     # Mac line break
+    text = _RE_EOL.sub('\n', text)  # Windows and Mac line breaks in one pass
     
     # Remove excessive consecutive spaces (but keep single spaces and line breaks)
-    text = re.sub(r'[ \t]+', ' ', text)  # Multiple spaces/tabs become single space
+    text = _RE_HSPACE.sub(' ', text)  # Multiple spaces/tabs become single space
     
     # Remove excessive line breaks (keep paragraph separators)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _RE_NL3.sub('\n\n', text)
     
     # Remove leading and trailing whitespace from lines
-    lines = text.split('\n')
-    lines = [line.strip() for line in lines]
-    text = '\n'.join(lines)
+    # (one regex pass instead of split/strip/join; the text ends are handled by the strip below)
+    text = _RE_LINE_TRIM.sub('\n', text)
     
     # Remove leading and trailing whitespace
     text = text.strip()
@@ -50,11 +72,14 @@ def normalize_whitespace(text: str) -> str:
     Returns:
         Normalized text
     """
+    if _RE_WS_DIRTY.search(text) is None:
+        return text.strip()
+    
     # Replace multiple spaces with single space
-    text = re.sub(r' +', ' ', text)
+    text = _RE_SPACES.sub(' ', text)
     
     # Replace multiple line breaks with at most two line breaks
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _RE_NL3.sub('\n\n', text)
     
     return text.strip()
 